@@ -0,0 +1,254 @@
+"""
+Answer-sheet annotation storage.
+
+Annotations live outside the answer sheet document, one document per
+(sheet_id, page) in the `annotations` collection, so sheet reads, lists and
+exports never carry them, a viewer can fetch just the page it is rendering,
+and a heavily marked sheet cannot push its document toward the 16 MB limit.
+The sheet keeps only counts (see count_annotations).
+
+Page documents are stored column-wise rather than as a list of dicts that
+repeats every field name per tick mark:
+
+    {"sheet_id": ..., "page": 3, "enc": 1, "n": 2,
+     "id": <16-byte uuids, packed> or ["ann_...", ...],
+     "t":  <uint8 type codes>,      "q": <uint16 question numbers>,
+     "x":  <int16 x * 10000>,       "y": <int16 y * 10000>,
+     "ts": <int64 epoch ms>,
+     "values": {"1": "2"}, "marks": {...}}   # sparse, index -> value
+
+Numeric columns are little-endian packed binary. Coordinates keep 1/10000 of
+a page of precision, timestamps milliseconds. encode_page/decode_page convert
+to and from the plain annotation dicts the API exposes; documents written
+before this encoding (with an `annotations` list) still decode.
+"""
+import sys
+import uuid
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from bson import Binary
+from pymongo import DeleteMany, ReplaceOne
+
+COLLECTION = "annotations"
+ENCODING_VERSION = 1
+
+TYPE_CODES = {
+    "correct": 0, "incorrect": 1, "half-mark": 2, "quarter-mark": 3, "numeric": 4,
+    "na": 5, "comment": 6, "circle": 7, "pen": 8,
+}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+# Types without a code are kept by name in the sparse "types" map
+OTHER_TYPE = 255
+
+COORD_SCALE = 10_000
+COORD_LIMIT = 32_767  # int16
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _pack(typecode: str, values: list) -> Binary:
+    packed = array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return Binary(packed.tobytes())
+
+
+def _unpack(typecode: str, data: bytes) -> list:
+    unpacked = array(typecode)
+    unpacked.frombytes(bytes(data))
+    if sys.byteorder != "little":
+        unpacked.byteswap()
+    return unpacked.tolist()
+
+
+def _pack_coordinates(values: List[float]) -> Binary:
+    try:
+        return _pack("h", [round(value * COORD_SCALE) for value in values])
+    except OverflowError:
+        # Far off the page (e.g. dragged past the edge); pin to the representable range
+        return _pack("h", [max(-COORD_LIMIT, min(COORD_LIMIT, round(value * COORD_SCALE))) for value in values])
+
+
+def _pack_questions(values: List[int]):
+    try:
+        return _pack("H", values)
+    except OverflowError:
+        # Question numbers are not range-checked on input; keep odd ones exactly, as a plain array
+        return list(values)
+
+
+def _unpack_questions(questions) -> List[int]:
+    return questions if isinstance(questions, list) else _unpack("H", questions)
+
+
+@lru_cache(maxsize=4096)
+def _minute_ms(prefix: str) -> int:
+    return round(datetime.fromisoformat(f"{prefix}00+00:00").timestamp() * 1000)
+
+
+def _epoch_ms(timestamp) -> Optional[int]:
+    # Fast path for UTC timestamps as Annotation.created_at and _iso write them
+    if isinstance(timestamp, str) and len(timestamp) >= 25 and timestamp[16] == ":" and timestamp.endswith("+00:00"):
+        try:
+            return _minute_ms(timestamp[:17]) + round(float(timestamp[17:-6]) * 1000)
+        except ValueError:
+            pass
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return round(parsed.timestamp() * 1000)
+
+
+@lru_cache(maxsize=4096)
+def _minute_prefix(minute: int) -> str:
+    return (EPOCH + timedelta(minutes=minute)).strftime("%Y-%m-%dT%H:%M:")
+
+
+def _iso(ms: int) -> str:
+    """UTC ISO timestamp for epoch ms; annotations made in the same minute share the formatted prefix"""
+    minute, rest = divmod(ms, 60_000)
+    return f"{_minute_prefix(minute)}{rest // 1000:02d}.{rest % 1000:03d}000+00:00"
+
+
+def _pack_ids(ids: List[str]):
+    """Canonical uuid strings pack to 16 bytes each; anything else stays a list of strings"""
+    try:
+        uuids = [uuid.UUID(annotation_id) for annotation_id in ids]
+    except (TypeError, ValueError, AttributeError):
+        return ids
+    if any(str(u) != annotation_id for u, annotation_id in zip(uuids, ids)):
+        return ids
+    return Binary(b"".join(u.bytes for u in uuids))
+
+
+def _unpack_ids(ids) -> List[str]:
+    if isinstance(ids, (bytes, Binary)):
+        return [str(uuid.UUID(bytes=bytes(ids[i:i + 16]))) for i in range(0, len(ids), 16)]
+    return list(ids)
+
+
+def _sparse(values: list) -> dict:
+    return {str(i): value for i, value in enumerate(values) if value is not None}
+
+
+def encode_page(sheet_id: str, page: int, annotations: List[dict]) -> dict:
+    """Columnar page document for annotations that all sit on `page`"""
+    types = [annotation["type"] for annotation in annotations]
+    created = [annotation.get("created_at") for annotation in annotations]
+    timestamps = [_epoch_ms(timestamp) for timestamp in created]
+
+    doc = {
+        "sheet_id": sheet_id,
+        "page": page,
+        "enc": ENCODING_VERSION,
+        "n": len(annotations),
+        "id": _pack_ids([annotation["id"] for annotation in annotations]),
+        "t": _pack("B", [TYPE_CODES.get(kind, OTHER_TYPE) for kind in types]),
+        "q": _pack_questions([annotation["question_number"] for annotation in annotations]),
+        "x": _pack_coordinates([annotation["x"] for annotation in annotations]),
+        "y": _pack_coordinates([annotation["y"] for annotation in annotations]),
+        "ts": _pack("q", [ms or 0 for ms in timestamps]),
+    }
+    sparse = {
+        "types": _sparse([None if kind in TYPE_CODES else kind for kind in types]),
+        "values": _sparse([annotation.get("value") for annotation in annotations]),
+        "marks": _sparse([annotation.get("marks") for annotation in annotations]),
+        # Timestamps that do not parse are kept verbatim; missing ones decode as the epoch
+        "created": {str(i): created[i] for i, ms in enumerate(timestamps) if ms is None and created[i] is not None},
+    }
+    doc.update((name, values) for name, values in sparse.items() if values)
+    return doc
+
+
+def decode_page(doc: dict) -> List[dict]:
+    """Annotation dicts from a page document"""
+    if "enc" not in doc:
+        return doc.get("annotations", [])
+    page = doc["page"]
+    annotations = [
+        {
+            "id": annotation_id,
+            "type": TYPE_NAMES.get(code),
+            "question_number": question,
+            "x": x / COORD_SCALE,
+            "y": y / COORD_SCALE,
+            "page": page,
+            "value": None,
+            "marks": None,
+            "created_at": _iso(ms),
+        }
+        for annotation_id, code, question, x, y, ms in zip(
+            _unpack_ids(doc["id"]),
+            _unpack("B", doc["t"]),
+            _unpack_questions(doc["q"]),
+            _unpack("h", doc["x"]),
+            _unpack("h", doc["y"]),
+            _unpack("q", doc["ts"]),
+        )
+    ]
+    for name, field in (("types", "type"), ("values", "value"), ("marks", "marks"), ("created", "created_at")):
+        for i, value in doc.get(name, {}).items():
+            annotations[int(i)][field] = value
+    return annotations
+
+
+def group_by_page(annotations: List[dict]) -> Dict[int, List[dict]]:
+    pages = defaultdict(list)
+    for annotation in annotations:
+        pages[int(annotation["page"])].append(annotation)
+    return dict(pages)
+
+
+def count_annotations(annotations: List[dict]) -> dict:
+    """Aggregate counts stored on the sheet: total and per page (keys are page numbers as strings)"""
+    return {
+        "annotation_count": len(annotations),
+        "annotation_counts": {str(page): len(items) for page, items in sorted(group_by_page(annotations).items())},
+    }
+
+
+def replace_operations(sheet_id: str, annotations: List[dict]) -> list:
+    """Bulk write operations making `annotations` the sheet's complete set.
+
+    All encoding happens here, so a caller that builds these before its other
+    writes fails on a bad annotation without having written anything.
+    """
+    pages = group_by_page(annotations)
+    operations = [
+        ReplaceOne({"sheet_id": sheet_id, "page": page}, encode_page(sheet_id, page, items), upsert=True)
+        for page, items in pages.items()
+    ]
+    operations.append(DeleteMany({"sheet_id": sheet_id, "page": {"$nin": list(pages)}}))
+    return operations
+
+
+async def write_operations(db, operations: list):
+    await db[COLLECTION].bulk_write(operations, ordered=False)
+
+
+async def replace_sheet_annotations(db, sheet_id: str, annotations: List[dict]):
+    """Make `annotations` the sheet's complete set, in one bulk write"""
+    await write_operations(db, replace_operations(sheet_id, annotations))
+
+
+async def load_annotations(db, sheet_id: str, page: Optional[int] = None) -> List[dict]:
+    """Annotations of one page, or of the whole sheet in page order"""
+    projection = {"_id": 0, "sheet_id": 0}
+    if page is not None:
+        doc = await db[COLLECTION].find_one({"sheet_id": sheet_id, "page": page}, projection)
+        return decode_page(doc) if doc else []
+    annotations = []
+    async for doc in db[COLLECTION].find({"sheet_id": sheet_id}, projection).sort("page", 1):
+        annotations.extend(decode_page(doc))
+    return annotations
+
+
+async def delete_sheet_annotations(db, sheet_id: str):
+    await db[COLLECTION].delete_many({"sheet_id": sheet_id})
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark annotation storage: one dict per annotation vs the columnar page
+encoding in annotation_store.py.
+
+Builds realistic pages (editor-generated ids, mostly ticks and crosses, a few
+numeric marks and comments) and reports the BSON size of a page document, the
+driver's BSON encode/decode time, the cost of the columnar codec itself, and
+the whole trip from Annotation models to stored bytes and back, which is what
+a grade save and a page fetch pay.
+
+Usage: python benchmark_annotations.py [annotations_per_page] [iterations]
+"""
+
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import bson
+
+import annotation_store
+from server import Annotation
+
+TYPES = ["correct"] * 6 + ["incorrect"] * 3 + ["half-mark", "numeric", "comment", "na"]
+
+
+def make_annotations(count: int, page: int = 1):
+    started = datetime(2026, 3, 2, 9, 30, tzinfo=timezone.utc)
+    annotations = []
+    for i in range(count):
+        kind = random.choice(TYPES)
+        annotations.append(Annotation(
+            id=f"ann_{1772443800000 + i * 1500}_{random.random()}",  # as created by EvaluationInterface
+            type=kind,
+            question_number=random.randint(1, 8),
+            x=random.random(),
+            y=random.random(),
+            page=page,
+            value=str(random.randint(1, 5)) if kind == "numeric" else ("Show working" if kind == "comment" else None),
+            marks=1.0 if kind == "correct" else None,
+            created_at=(started + timedelta(seconds=i * 1.5, microseconds=random.randrange(10**6))).isoformat(),
+        ))
+    return annotations
+
+
+def timed(fn, iterations: int) -> float:
+    """Best of five runs, ms per call"""
+    best = min(timeit.repeat(fn, number=iterations, repeat=5))
+    return best / iterations * 1000
+
+
+def main():
+    per_page = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    random.seed(7)
+    annotations = make_annotations(per_page)
+    dumped = [a.model_dump() for a in annotations]
+
+    verbose_doc = {"sheet_id": "sheet-1", "page": 1, "annotations": dumped}
+    compact_doc = annotation_store.encode_page("sheet-1", 1, dumped)
+    verbose, compact = bson.encode(verbose_doc), bson.encode(compact_doc)
+
+    decoded = [Annotation(**a) for a in annotation_store.decode_page(bson.decode(compact))]
+    assert [a.id for a in decoded] == [a.id for a in annotations]
+    worst_shift = max(max(abs(a.x - b.x), abs(a.y - b.y)) for a, b in zip(annotations, decoded))
+
+    # (label, verbose, columnar); the driver's BSON work, our codec, and the
+    # whole trip from Annotation models to stored bytes and back
+    rows = [
+        ("BSON encode", timed(lambda: bson.encode(verbose_doc), iterations),
+         timed(lambda: bson.encode(compact_doc), iterations)),
+        ("BSON decode", timed(lambda: bson.decode(verbose), iterations),
+         timed(lambda: bson.decode(compact), iterations)),
+        ("Codec encode", 0.0, timed(lambda: annotation_store.encode_page("sheet-1", 1, dumped), iterations)),
+        ("Codec decode", 0.0, timed(lambda: annotation_store.decode_page(compact_doc), iterations)),
+        ("Models -> bytes",
+         timed(lambda: bson.encode({"sheet_id": "sheet-1", "page": 1,
+                                    "annotations": [a.model_dump() for a in annotations]}), iterations),
+         timed(lambda: bson.encode(annotation_store.encode_page(
+             "sheet-1", 1, [a.model_dump() for a in annotations])), iterations)),
+        ("Bytes -> models",
+         timed(lambda: [Annotation(**a) for a in annotation_store.decode_page(bson.decode(verbose))], iterations),
+         timed(lambda: [Annotation(**a) for a in annotation_store.decode_page(bson.decode(compact))], iterations)),
+    ]
+
+    print("=" * 62)
+    print(f"Annotation storage — {per_page} annotations per page")
+    print("=" * 62)
+    print(f"{'':20}{'verbose':>12}{'columnar':>12}{'saving':>10}")
+    print(f"{'Page bytes':20}{len(verbose):>12}{len(compact):>12}{1 - len(compact) / len(verbose):>10.0%}")
+    print(f"{'Bytes/annotation':20}{len(verbose) / per_page:>12.1f}{len(compact) / per_page:>12.1f}")
+    for label, before, after in rows:
+        saving = f"{1 - after / before:>10.0%}" if before else ""
+        print(f"{label + ' ms':20}{before:>12.3f}{after:>12.3f}{saving}")
+    print(f"\nLargest coordinate change from quantization: {worst_shift:.6f} of a page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark login password verification: inline bcrypt vs the PasswordService pool.
+
+Simulates a burst of concurrent logins (like the start of exam day) and, at the
+same time, a stream of cheap "other" requests (grade saves, PDF chunks). Reports
+login throughput, p50/p99 login latency and the p99 delay seen by the other
+requests, which is what teachers feel when the event loop is blocked.
+
+Usage: python benchmark_login.py [concurrent_logins] [workers]
+"""
+
+import asyncio
+import sys
+import time
+
+from password_service import PasswordService, hash_password, verify_password
+
+PASSWORD = "exam-day-password"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def heartbeat(stop: asyncio.Event, delays: list, interval: float = 0.01):
+    """Stand-in for other requests: measures how late the loop wakes us up"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        delays.append(max(0.0, time.perf_counter() - expected))
+
+
+async def run(mode: str, logins: int, hashed: str, service: PasswordService):
+    # Latency is measured from the start of the burst, i.e. from when the
+    # request arrived, so time spent waiting for the loop or the pool counts.
+    async def inline_login():
+        assert verify_password(PASSWORD, hashed)
+        return time.perf_counter() - started
+
+    async def pooled_login():
+        assert await service.verify(PASSWORD, hashed)
+        return time.perf_counter() - started
+
+    login = inline_login if mode == "inline" else pooled_login
+    stop = asyncio.Event()
+    delays = []
+    beat = asyncio.create_task(heartbeat(stop, delays))
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await beat
+
+    print(f"\n{mode.upper()} ({logins} concurrent logins)")
+    print("-" * 50)
+    print(f"Throughput:           {logins / elapsed:8.2f} logins/s")
+    print(f"Login p50 latency:    {percentile(latencies, 50) * 1000:8.1f} ms")
+    print(f"Login p99 latency:    {percentile(latencies, 99) * 1000:8.1f} ms")
+    if delays:
+        print(f"Other requests p99:   {percentile(delays, 99) * 1000:8.1f} ms delay")
+    else:
+        print("Other requests:       starved for the whole burst")
+
+
+async def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    hashed = hash_password(PASSWORD)
+    service = PasswordService(workers)
+    # Warm the pool so worker start-up is not counted against the first logins
+    await asyncio.gather(*(service.verify(PASSWORD, hashed) for _ in range(service.max_workers)))
+
+    print("=" * 50)
+    print(f"Login benchmark — pool workers: {service.max_workers}")
+    print("=" * 50)
+    try:
+        await run("inline", logins, hashed, service)
+        await run("pool", logins, hashed, service)
+        print(f"\nPool stats: {service.stats()}")
+    finally:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
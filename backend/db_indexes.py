@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Declarative MongoDB index registry.
+
+Every hot query in server.py should be backed by an index listed here.
+The registry is applied at server startup and can also be run by hand:
+
+    python db_indexes.py           # create missing indexes, then print a report
+    python db_indexes.py --check   # only report; exits 1 if anything is missing
+"""
+import asyncio
+import logging
+import sys
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Indexes that always exist and are never reported as unmanaged or unused
+BUILTIN_INDEXES = {"_id_"}
+
+INDEX_REGISTRY = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "students": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email"),
+        # get_students pages: each filter it accepts, then _id for the keyset order
+        IndexModel([("class_name", ASCENDING), ("_id", ASCENDING)], name="class_page"),
+        IndexModel([("class_name", ASCENDING), ("semester", ASCENDING), ("_id", ASCENDING)], name="class_semester_page"),
+        IndexModel([("semester", ASCENDING), ("_id", ASCENDING)], name="semester_page"),
+    ],
+    "teachers": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email"),
+    ],
+    "subjects": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # get_subjects pages when the collection is too big for the reference cache
+        IndexModel([("class_name", ASCENDING), ("_id", ASCENDING)], name="class_page"),
+    ],
+    "exams": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # teacher-scoped get_exams pages ($in over subjects merges the sorted ranges)
+        IndexModel([("subject_id", ASCENDING), ("_id", ASCENDING)], name="subject_page"),
+    ],
+    "answer_sheets": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # upload_answer_sheet's duplicate check and per-exam listings/exports
+        IndexModel(
+            [("exam_id", ASCENDING), ("student_id", ASCENDING), ("status", ASCENDING)],
+            name="exam_student_status",
+        ),
+        # teacher work lists, optionally filtered by status; _id orders the queue pages
+        IndexModel(
+            [("assigned_teacher_id", ASCENDING), ("status", ASCENDING), ("_id", ASCENDING)],
+            name="teacher_queue",
+        ),
+        # get_answer_sheets pages filtered by one field (other filters are applied on top of these)
+        IndexModel([("assigned_teacher_id", ASCENDING), ("_id", ASCENDING)], name="teacher_page"),
+        IndexModel([("student_id", ASCENDING), ("_id", ASCENDING)], name="student_page"),
+        IndexModel([("status", ASCENDING), ("_id", ASCENDING)], name="status_page"),
+        # pending counts and queues only ever look at the (shrinking) pending set
+        IndexModel(
+            [("status", ASCENDING), ("created_at", ASCENDING)],
+            name="pending_by_age",
+            partialFilterExpression={"status": "pending"},
+        ),
+    ],
+    # annotation_store: one document per annotated page of a sheet
+    "annotations": [
+        IndexModel([("sheet_id", ASCENDING), ("page", ASCENDING)], name="sheet_page_unique", unique=True),
+    ],
+    "answer_sheet_drafts": [
+        IndexModel([("sheet_id", ASCENDING)], name="sheet_id_unique", unique=True),
+    ],
+    # transcripts.py: one results document per student
+    "student_results": [
+        IndexModel([("student_id", ASCENDING)], name="student_id_unique", unique=True),
+        IndexModel([("student.email", ASCENDING)], name="student_email"),
+    ],
+    "token_revocations": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # A revocation only matters until the tokens it cuts off have expired;
+        # server.py sets the expiry to the access-token lifetime.
+        IndexModel([("revoked_at", ASCENDING)], name="revoked_at_ttl", expireAfterSeconds=60 * 60 * 24),
+    ],
+    "refresh_tokens": [
+        IndexModel([("token_hash", ASCENDING)], name="token_hash_unique", unique=True),
+        IndexModel([("family_id", ASCENDING)], name="family_id"),
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+def set_ttl(collection: str, name: str, seconds: int):
+    """Override the expiry of a registered TTL index (e.g. from configuration)"""
+    for index in INDEX_REGISTRY[collection]:
+        if index.document["name"] == name:
+            index.document["expireAfterSeconds"] = seconds
+            return
+    raise KeyError(f"{collection}.{name} is not a registered index")
+
+
+async def ensure_indexes(db) -> dict:
+    """Create every registered index; returns {"created": [...], "errors": [...]}"""
+    created, errors = [], []
+    for collection, indexes in INDEX_REGISTRY.items():
+        existing = await db[collection].index_information()
+        for index in indexes:
+            name = index.document["name"]
+            if name in existing:
+                continue
+            try:
+                await db[collection].create_indexes([index])
+                created.append(f"{collection}.{name}")
+                logger.info(f"✅ Created index {collection}.{name}")
+            except OperationFailure as e:
+                # Typically duplicate data under a unique index, or an existing
+                # index on the same keys with different options; keep going.
+                errors.append({"index": f"{collection}.{name}", "error": str(e)})
+                logger.error(f"❌ Could not create index {collection}.{name}: {e}")
+    return {"created": created, "errors": errors}
+
+
+async def index_report(db) -> dict:
+    """Compare the database against the registry.
+
+    missing:   registered indexes that do not exist
+    unmanaged: indexes that exist but are not in the registry
+    unused:    indexes with no recorded accesses since the mongod last started
+    """
+    missing, unmanaged, unused = [], [], []
+    for collection, indexes in INDEX_REGISTRY.items():
+        registered = {index.document["name"] for index in indexes}
+        existing = await db[collection].index_information()
+        missing.extend(f"{collection}.{name}" for name in sorted(registered - set(existing)))
+        unmanaged.extend(
+            f"{collection}.{name}" for name in sorted(set(existing) - registered - BUILTIN_INDEXES)
+        )
+        try:
+            async for stat in db[collection].aggregate([{"$indexStats": {}}]):
+                if stat["name"] not in BUILTIN_INDEXES and stat["accesses"]["ops"] == 0:
+                    unused.append(f"{collection}.{stat['name']}")
+        except OperationFailure as e:
+            # $indexStats is not available on every tier (e.g. Atlas shared clusters)
+            logger.warning(f"⚠️ Index usage stats unavailable for {collection}: {e}")
+    return {"missing": missing, "unmanaged": unmanaged, "unused": sorted(unused)}
+
+
+async def main():
+    import os
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    check_only = "--check" in sys.argv[1:]
+
+    try:
+        if not check_only:
+            result = await ensure_indexes(db)
+            print(f"Created {len(result['created'])} index(es)")
+            for error in result["errors"]:
+                print(f"❌ {error['index']}: {error['error']}")
+        report = await index_report(db)
+        print("=" * 50)
+        for key in ("missing", "unmanaged", "unused"):
+            print(f"{key.capitalize()} ({len(report[key])}):")
+            for name in report[key]:
+                print(f"   {name}")
+        if check_only and report["missing"]:
+            sys.exit(1)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Request-scoped batched lookups by id.
+
+A BatchLoader is created for one request (or one job) and used instead of
+one `find_one({"id": ...})` per related document. Lookups made in the same
+event-loop tick, e.g. from coroutines started together with
+asyncio.gather() or a single load_many(), are sent as one
+`{"id": {"$in": [...]}}` query per collection. Every result, including "not
+found", is remembered for the rest of the loader's life, so asking again
+costs nothing:
+
+    loader = BatchLoader(db)
+    students = await loader.load_many("students", [s["student_id"] for s in sheets])
+    exam, student = await asyncio.gather(loader.load("exams", e_id), loader.load("students", s_id))
+
+Documents come back as stored, without `_id`. The same dict is returned to
+every caller asking for an id, so treat results as read-only. A loader never
+sees writes made after it fetched a document; don't keep one beyond the
+request it was made for.
+"""
+import asyncio
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+
+class BatchLoader:
+    def __init__(self, database):
+        self.database = database
+        self._results: Dict[tuple, asyncio.Future] = {}
+        self._pending: Dict[str, Dict[Hashable, asyncio.Future]] = {}
+        # The event loop only holds weak references to tasks; keep in-flight fetches alive
+        self._tasks: Set[asyncio.Task] = set()
+        self.queries = 0
+
+    def load(self, collection: str, doc_id: Hashable) -> "asyncio.Future[Optional[dict]]":
+        """The document with `doc_id` in `collection`, or None"""
+        key = (collection, doc_id)
+        result = self._results.get(key)
+        if result is None:
+            loop = asyncio.get_running_loop()
+            result = self._results[key] = loop.create_future()
+            pending = self._pending.setdefault(collection, {})
+            if not pending:
+                # Runs after everything already scheduled for this tick has had its turn
+                loop.call_soon(self._dispatch, collection)
+            pending[doc_id] = result
+        # One caller being cancelled must not cancel the lookup the others share
+        return asyncio.shield(result)
+
+    async def load_many(self, collection: str, doc_ids: Iterable[Hashable]) -> List[Optional[dict]]:
+        """Documents for `doc_ids` in the same order, None for ids that don't exist"""
+        return list(await asyncio.gather(*(self.load(collection, doc_id) for doc_id in doc_ids)))
+
+    def _dispatch(self, collection: str):
+        pending = self._pending.pop(collection, {})
+        if pending:
+            task = asyncio.ensure_future(self._fetch(collection, pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, collection: str, pending: Dict[Hashable, asyncio.Future]):
+        self.queries += 1
+        try:
+            docs = await self.database[collection].find({"id": {"$in": list(pending)}}, {"_id": 0}).to_list(None)
+        except Exception as e:
+            for doc_id, result in pending.items():
+                # A failure isn't memoized; the next load() of these ids tries again
+                self._results.pop((collection, doc_id), None)
+                if not result.done():
+                    result.set_exception(e)
+            return
+        by_id = {doc["id"]: doc for doc in docs}
+        for doc_id, result in pending.items():
+            if not result.done():
+                result.set_result(by_id.get(doc_id))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Move annotations embedded in answer sheet documents into the page-indexed
+`annotations` collection (see annotation_store.py) and replace them on the
+sheet with annotation_count / annotation_counts.
+
+Safe to re-run: only sheets that still have an `annotations` field are
+touched, and rewriting a sheet's pages replaces whatever an interrupted run
+left behind.
+
+    python migrate_annotations.py             # migrate
+    python migrate_annotations.py --dry-run   # only report what would move
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import annotation_store
+import db_indexes
+
+
+async def migrate(db, dry_run: bool = False) -> dict:
+    sheets = moved = 0
+    cursor = db.answer_sheets.find({"annotations": {"$exists": True}}, {"_id": 0, "id": 1, "annotations": 1})
+    async for sheet in cursor:
+        annotations = sheet.get("annotations") or []
+        sheets += 1
+        moved += len(annotations)
+        if dry_run:
+            continue
+        await annotation_store.replace_sheet_annotations(db, sheet["id"], annotations)
+        await db.answer_sheets.update_one(
+            {"id": sheet["id"]},
+            {"$set": annotation_store.count_annotations(annotations), "$unset": {"annotations": ""}},
+        )
+    return {"sheets": sheets, "annotations": moved}
+
+
+async def main():
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    dry_run = "--dry-run" in sys.argv[1:]
+
+    try:
+        if not dry_run:
+            await db_indexes.ensure_indexes(db)
+        result = await migrate(db, dry_run)
+        verb = "Would move" if dry_run else "Moved"
+        print(f"{verb} {result['annotations']} annotation(s) from {result['sheets']} answer sheet(s)")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
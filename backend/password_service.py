@@ -0,0 +1,110 @@
+"""
+Password hashing service.
+
+bcrypt is deliberately slow (~200 ms per call), so running it inside an async
+handler stalls every other request on the event loop. PasswordService runs the
+hashing functions in a process pool sized to the machine's cores and keeps
+simple queue-depth counters so we can see when logins are backing up.
+
+The worker functions live in this module (and not in server.py) so that pool
+workers only need to import bcrypt, not the whole FastAPI app.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+class PasswordService:
+    """Executor-backed bcrypt hashing with queue depth metrics"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self.executor_kind = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            try:
+                # spawn keeps workers free of the parent's Mongo client threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self.executor_kind = "process"
+            except (OSError, NotImplementedError) as e:
+                # Serverless runtimes (e.g. Vercel) have no working multiprocessing;
+                # bcrypt releases the GIL so threads still keep the loop responsive.
+                logger.warning(f"⚠️ Process pool unavailable, using threads for bcrypt: {e}")
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                self.executor_kind = "thread"
+            logger.info(f"✅ Password service started ({self.executor_kind} pool, {self.max_workers} workers)")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed); start a fresh pool on the next call
+            logger.error("❌ Password worker pool broke, it will be recreated")
+            self.failed += 1
+            if self._executor is executor:
+                self._executor = None
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        # Only successful calls count towards completed and avg_ms
+        self.completed += 1
+        self.total_seconds += time.perf_counter() - started
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(verify_password, password, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor_kind,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_ms": round(self.total_seconds * 1000 / self.completed, 2) if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,23 +1,42 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Depends
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Depends, Request, Response, Query
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, create_model
+from typing import Dict, List, Optional, Tuple
 import uuid
+import json
 from datetime import datetime, timezone, timedelta
-import bcrypt
 import shutil
+import sys
+import asyncio
+import time
+import math
+import hmac
+import hashlib
+import secrets
+from collections import OrderedDict
+import functools
 import jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from bson import ObjectId
+from bson import ObjectId, encode as encode_bson
+from pymongo import ReturnDocument, UpdateMany
 from gridfs import NoFile
 
 ROOT_DIR = Path(__file__).parent
+# Make sibling modules importable when the app is loaded from another directory (e.g. Vercel)
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from password_service import PasswordService
+import db_indexes
+import annotation_store
+from loaders import BatchLoader
+import transcripts
 
 # Load environment variables
 load_dotenv(ROOT_DIR / '.env')
@@ -105,16 +124,470 @@ JWT_SECRET = os.environ.get("JWT_SECRET", "change_this_secret")
 JWT_ALGORITHM = "HS256"
 auth_scheme = HTTPBearer()
 
+# bcrypt runs in a process pool sized to the cores (override with PASSWORD_POOL_WORKERS)
+password_service = PasswordService(int(os.environ.get("PASSWORD_POOL_WORKERS", "0")) or None)
+
 logger.info("✅ Server router initialization completed successfully")
 
 
-def create_access_token(data: dict, expires_minutes: int = 60 * 24) -> str:
+class TTLCache:
+    """Small in-process LRU cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Authenticated principals keyed by token subject (email), so protected
+# requests don't need a db.users round trip to learn a role we already signed.
+principal_cache = TTLCache(
+    maxsize=int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("PRINCIPAL_CACHE_TTL", "60")),
+)
+
+# Teacher authorization contexts (see TeacherAccess) keyed by email, same bounds as principals
+teacher_access_cache = TTLCache(maxsize=principal_cache.maxsize, ttl=principal_cache.ttl)
+
+def invalidate_principal(*emails: Optional[str]):
+    for email in emails:
+        if email:
+            principal_cache.pop(email)
+            teacher_access_cache.pop(email)
+
+
+class ReferenceCache:
+    """In-memory copy of a small, rarely written collection (subjects, exams, teachers).
+
+    The whole collection is loaded with one query, ordered by _id so keyset
+    pages can be cut from it, and kept for `ttl` seconds. The API's own
+    create/update/delete handlers write through with put()/discard(); the TTL
+    bounds how long writes made elsewhere (another worker, a script) go
+    unseen. A collection with more than `maxsize` documents is not cached.
+
+    find_one()/find() mirror the collection methods they replace. Equality
+    and $in filters are answered from memory; other filters and uncached
+    collections go to Mongo, and so do requested ids (an `id` filter) the
+    snapshot doesn't have, so a document created by another worker is
+    found before the TTL runs out. Returned documents are shallow copies,
+    so nested values must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._docs: Optional[List[dict]] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.oversized = False
+
+    async def _snapshot(self, collection) -> Optional[List[dict]]:
+        """Current documents, loading them when expired; None when the collection is too big to cache"""
+        if time.monotonic() < self._expires_at:
+            return self._docs
+        async with self._lock:
+            if time.monotonic() < self._expires_at:
+                return self._docs
+            generation = self._generation
+            docs = await collection.find({}).sort("_id", 1).to_list(self.maxsize + 1)
+            self.loads += 1
+            self.oversized = len(docs) > self.maxsize
+            if self.oversized:
+                docs = None
+            # A write that landed while loading may be missing from `docs`; serve it once but don't keep it
+            if generation == self._generation:
+                self._docs = docs
+                self._expires_at = time.monotonic() + self.ttl
+            return docs
+
+    @staticmethod
+    def _answerable(query: dict) -> bool:
+        return all(
+            not field.startswith("$") and "." not in field and not isinstance(condition, list)
+            and (not isinstance(condition, dict) or list(condition) == ["$in"])
+            for field, condition in query.items()
+        )
+
+    @staticmethod
+    def _matches(doc: dict, query: dict) -> bool:
+        for field, condition in query.items():
+            candidates = condition["$in"] if isinstance(condition, dict) else [condition]
+            value = doc.get(field)
+            # Like Mongo, a filter on an array field matches any element
+            if not any(v in candidates for v in (value if isinstance(value, list) else [value])):
+                return False
+        return True
+
+    @staticmethod
+    def _project(doc: dict, projection: Optional[dict]) -> dict:
+        if not projection:
+            return dict(doc)
+        included = [name for name, keep in projection.items() if keep and name != "_id"]
+        if not included:
+            return {name: value for name, value in doc.items() if projection.get(name, 1)}
+        if projection.get("_id", 1):
+            included.append("_id")
+        return {name: doc[name] for name in included if name in doc}
+
+    def _count(self, fresh: bool):
+        """A read served from a snapshot that was already loaded is a hit; one that had to load it is a miss"""
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    async def find_one(self, collection, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        if self._answerable(query):
+            fresh = time.monotonic() < self._expires_at
+            docs = await self._snapshot(collection)
+            for doc in docs or ():
+                if self._matches(doc, query):
+                    self._count(fresh)
+                    return self._project(doc, projection)
+        self.misses += 1
+        return await collection.find_one(query, projection)
+
+    async def find(self, collection, query: dict, projection: Optional[dict] = None,
+                   after: Optional[ObjectId] = None, limit: Optional[int] = None) -> List[dict]:
+        """Matching documents in _id order, those after `after` when given; all of them without a `limit`"""
+        fresh = time.monotonic() < self._expires_at
+        docs = await self._snapshot(collection) if self._answerable(query) else None
+        if docs is None:
+            self.misses += 1
+            cursor = collection.find({**query, "_id": {"$gt": after}} if after else query, projection).sort("_id", 1)
+            if limit:
+                cursor = cursor.limit(limit)
+            return await cursor.to_list(limit)
+        matched = [doc for doc in docs if (after is None or doc["_id"] > after) and self._matches(doc, query)]
+        missing = self._missing_ids(query, matched)
+        if missing:
+            self.misses += 1
+            lookup = {**query, "id": {"$in": missing}}
+            if after:
+                lookup["_id"] = {"$gt": after}
+            # Unprojected, so the _id order can be restored across both sources
+            matched = sorted(matched + await collection.find(lookup).to_list(None), key=lambda doc: doc["_id"])
+        else:
+            self._count(fresh)
+        if limit:
+            matched = matched[:limit]
+        return [self._project(doc, projection) for doc in matched]
+
+    @staticmethod
+    def _missing_ids(query: dict, matched: List[dict]) -> List:
+        """Ids an `id` filter asks for that the snapshot didn't match"""
+        if "id" not in query:
+            return []
+        condition = query["id"]
+        requested = condition["$in"] if isinstance(condition, dict) else [condition]
+        found = {doc["id"] for doc in matched}
+        return [doc_id for doc_id in dict.fromkeys(requested) if doc_id not in found]
+
+    def put(self, doc: dict):
+        """Write-through for a created or updated document (the complete stored version)"""
+        self._generation += 1
+        if self._docs is None:
+            return
+        for i, cached in enumerate(self._docs):
+            if cached["id"] == doc["id"]:
+                self._docs[i] = {**doc, "_id": cached["_id"]}
+                return
+        # insert_one() has given a new document its _id, which sorts last
+        if "_id" in doc and len(self._docs) < self.maxsize:
+            self._docs.append(dict(doc))
+        else:
+            self.invalidate()
+
+    def discard(self, doc_id: str):
+        self._generation += 1
+        if self._docs is not None:
+            self._docs = [doc for doc in self._docs if doc["id"] != doc_id]
+
+    def invalidate(self):
+        self._generation += 1
+        self._docs = None
+        self._expires_at = 0.0
+
+    async def warm(self, collection):
+        self.invalidate()
+        await self._snapshot(collection)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._docs) if self._docs is not None else 0,
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "oversized": self.oversized,
+            "loads": self.loads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+REFERENCE_CACHE_SIZE = int(os.environ.get("REFERENCE_CACHE_SIZE", "5000"))
+REFERENCE_CACHE_TTL = float(os.environ.get("REFERENCE_CACHE_TTL", "60"))
+subject_cache = ReferenceCache(REFERENCE_CACHE_SIZE, REFERENCE_CACHE_TTL)
+exam_cache = ReferenceCache(REFERENCE_CACHE_SIZE, REFERENCE_CACHE_TTL)
+teacher_cache = ReferenceCache(REFERENCE_CACHE_SIZE, REFERENCE_CACHE_TTL)
+REFERENCE_CACHES = {"subjects": subject_cache, "exams": exam_cache, "teachers": teacher_cache}
+
+async def warm_reference_caches(database):
+    await asyncio.gather(*(cache.warm(database[name]) for name, cache in REFERENCE_CACHES.items()))
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets refilled at `rate` tokens/second up to `burst`"""
+
+    def __init__(self, rate: float, burst: float, maxsize: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+
+    def acquire(self, key: str) -> float:
+        """Take one token for `key`; returns 0 if allowed, else seconds to wait"""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            retry_after = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (1 - tokens) / self.rate
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class LoginAdmission:
+    """Keeps failed or scripted logins from eating the bcrypt CPU budget.
+
+    Attempts are rate limited per client IP and per email, and the number of
+    password verifications running at once is capped; anything over the
+    limits is turned away with 429 before any bcrypt work is done.
+    """
+
+    def __init__(self, ip_limiter: TokenBucketLimiter, email_limiter: TokenBucketLimiter, max_in_flight: int):
+        self.ip_limiter = ip_limiter
+        self.email_limiter = email_limiter
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rejected_ip = 0
+        self.rejected_email = 0
+        self.rejected_busy = 0
+
+    def check_rate(self, ip: str, email: str):
+        retry_after = self.ip_limiter.acquire(ip)
+        if retry_after:
+            self.rejected_ip += 1
+            raise too_many_requests("Too many login attempts from this address", retry_after)
+        retry_after = self.email_limiter.acquire(email.strip().lower())
+        if retry_after:
+            self.rejected_email += 1
+            raise too_many_requests("Too many login attempts for this account", retry_after)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            self.rejected_busy += 1
+            raise too_many_requests("Login service busy, please retry", 1)
+        self.in_flight += 1
+        try:
+            return await password_service.verify(password, hashed)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rejected_ip": self.rejected_ip,
+            "rejected_email": self.rejected_email,
+            "rejected_busy": self.rejected_busy,
+        }
+
+
+def too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+# Defaults allow a whole lab behind one NAT address to log in together while
+# capping guesses against any single account.
+login_admission = LoginAdmission(
+    ip_limiter=TokenBucketLimiter(
+        rate=float(os.environ.get("LOGIN_IP_RATE", "2")),
+        burst=float(os.environ.get("LOGIN_IP_BURST", "60")),
+    ),
+    email_limiter=TokenBucketLimiter(
+        rate=float(os.environ.get("LOGIN_EMAIL_RATE", "0.1")),
+        burst=float(os.environ.get("LOGIN_EMAIL_BURST", "5")),
+    ),
+    max_in_flight=int(os.environ.get("LOGIN_MAX_IN_FLIGHT", "0")) or password_service.max_workers * 4,
+)
+TRUST_FORWARDED_FOR = os.environ.get("TRUST_FORWARDED_FOR", "false").lower() == "true"
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+# Authentication mode: "database" looks every principal up in db.users (through
+# the principal cache); "claims" trusts the signed token claims and only checks
+# them against an in-memory revocation set, so requests never touch db.users.
+AUTH_MODE = os.environ.get("AUTH_MODE", "database").lower()
+ACCESS_TOKEN_MINUTES = int(os.environ.get("ACCESS_TOKEN_MINUTES", str(60 * 24)))
+REFRESH_TOKEN_DAYS = int(os.environ.get("REFRESH_TOKEN_DAYS", "30"))
+# A token rotated this recently may be presented again (two tabs refreshing together) without counting as theft
+REFRESH_REUSE_GRACE_SECONDS = float(os.environ.get("REFRESH_REUSE_GRACE_SECONDS", "30"))
+REVOCATION_REFRESH_SECONDS = float(os.environ.get("REVOCATION_REFRESH_SECONDS", "5"))
+
+
+class RevocationSet:
+    """Minimum valid token version per email, mirrored from db.token_revocations"""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._min_versions = {}
+        self.refreshed_at = None
+        self.refreshes = 0
+
+    def is_revoked(self, email: str, token_version: int) -> bool:
+        return token_version < self._min_versions.get(email, 0)
+
+    def min_version(self, email: str) -> int:
+        return self._min_versions.get(email, 0)
+
+    def revoke(self, email: str, min_version: int):
+        self._min_versions[email] = max(min_version, self._min_versions.get(email, 0))
+
+    def is_stale(self) -> bool:
+        # Used when the background refresher is not running (e.g. serverless)
+        return self.refreshed_at is None or time.monotonic() - self.refreshed_at > self.refresh_seconds * 3
+
+    async def refresh(self, database):
+        docs = await database.token_revocations.find({}, {"_id": 0, "email": 1, "min_version": 1}).to_list(None)
+        self._min_versions = {d["email"]: d["min_version"] for d in docs}
+        self.refreshed_at = time.monotonic()
+        self.refreshes += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._min_versions),
+            "refreshes": self.refreshes,
+            "age_seconds": round(time.monotonic() - self.refreshed_at, 2) if self.refreshed_at else None,
+        }
+
+
+revocations = RevocationSet(REVOCATION_REFRESH_SECONDS)
+# Revocations only matter until the tokens they cut off have expired
+db_indexes.set_ttl("token_revocations", "revoked_at_ttl", ACCESS_TOKEN_MINUTES * 60)
+
+
+async def refresh_revocations_forever():
+    while True:
+        try:
+            database = get_db()
+            if database is not None:
+                await revocations.refresh(database)
+        except Exception as e:
+            logger.error(f"Failed to refresh token revocations: {e}")
+        await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+
+
+def create_access_token(data: dict, expires_minutes: int = ACCESS_TOKEN_MINUTES) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
     to_encode["exp"] = expire
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
+async def build_token_claims(user: dict, database) -> dict:
+    """Versioned claims that let AUTH_MODE=claims authorize without a db lookup"""
+    claims = {
+        "sub": user["email"],
+        "role": user["role"],
+        "uid": user.get("id"),
+        "name": user.get("name"),
+        "tv": user.get("token_version", 0),
+    }
+    if user["role"] == "teacher":
+        teacher = await database.teachers.find_one({"email": user["email"]}, {"_id": 0, "id": 1, "subject_ids": 1})
+        if teacher:
+            claims["teacher_id"] = teacher["id"]
+            claims["subject_ids"] = teacher.get("subject_ids", [])
+    elif user["role"] == "student":
+        student = await database.students.find_one({"email": user["email"]}, {"_id": 0, "id": 1})
+        if student:
+            claims["student_id"] = student["id"]
+    return claims
+
+
+def principal_from_claims(payload: dict) -> dict:
+    principal = {
+        "id": payload.get("uid"),
+        "email": payload["sub"],
+        "role": payload.get("role"),
+        "name": payload.get("name"),
+        "token_version": payload.get("tv", 0),
+    }
+    for key in ("teacher_id", "subject_ids", "student_id"):
+        if key in payload:
+            principal[key] = payload[key]
+    return principal
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(auth_scheme),
 ):
@@ -124,19 +597,101 @@ async def get_current_user(
         email = payload.get("sub")
         if not email:
             raise HTTPException(status_code=401, detail="Invalid token")
-        # Get database connection lazily
-        database = get_db()
-        if database is None:
-            raise HTTPException(status_code=503, detail="Database connection not available")
-        user = await database.users.find_one({"email": email}, {"_id": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
+        token_version = payload.get("tv", 0)
+        if AUTH_MODE == "claims":
+            if not payload.get("role"):
+                raise HTTPException(status_code=401, detail="Invalid token")
+            if revocations.is_stale():
+                database = get_db()
+                if database is None:
+                    raise HTTPException(status_code=503, detail="Database connection not available")
+                await revocations.refresh(database)
+            if revocations.is_revoked(email, token_version):
+                raise HTTPException(status_code=401, detail="Token revoked")
+            return principal_from_claims(payload)
+        user = principal_cache.get(email)
+        if user is None:
+            # Get database connection lazily
+            database = get_db()
+            if database is None:
+                raise HTTPException(status_code=503, detail="Database connection not available")
+            user = await database.users.find_one({"email": email}, {"_id": 0, "password_hash": 0})
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            principal_cache.set(email, user)
+        if token_version < user.get("token_version", 0):
+            raise HTTPException(status_code=401, detail="Token revoked")
+        return dict(user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+
+async def revoke_tokens(database, email: Optional[str], end_sessions: bool = False):
+    """Invalidate every access token issued to `email` so far.
+
+    Bumps the user's token_version and publishes the new minimum to
+    db.token_revocations so other workers pick it up on their next refresh.
+    Refresh tokens stay usable (they pick up fresh claims) unless
+    `end_sessions` is set. Call it before deleting a user so the record is
+    still there to bump.
+    """
+    if not email:
+        return
+    if end_sessions:
+        await database.refresh_tokens.update_many({"email": email, "revoked": False}, {"$set": {"revoked": True}})
+    user = await database.users.find_one_and_update(
+        {"email": email},
+        {"$inc": {"token_version": 1}},
+        projection={"_id": 0, "token_version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    min_version = user["token_version"] if user else revocations.min_version(email) + 1
+    await database.token_revocations.update_one(
+        {"email": email},
+        {"$max": {"min_version": min_version}, "$set": {"revoked_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    revocations.revoke(email, min_version)
+    invalidate_principal(email)
+
+
+class TeacherAccess:
+    """What a teacher principal may work on: built once per principal, then answered from memory"""
+
+    __slots__ = ("teacher_id", "subject_ids")
+
+    def __init__(self, teacher_id: str, subject_ids: Optional[List[str]]):
+        self.teacher_id = teacher_id
+        self.subject_ids = frozenset(subject_ids or ())
+
+    def may_access_subject(self, subject_id: Optional[str]) -> bool:
+        return subject_id in self.subject_ids
+
+    def may_access_exam(self, exam: dict) -> bool:
+        return self.may_access_subject(exam.get("subject_id"))
+
+async def get_teacher_access(user: dict, database) -> Optional[TeacherAccess]:
+    """Authorization context for a teacher principal; None without a teacher profile.
+
+    Comes straight from the token in claims mode, otherwise from
+    teacher_access_cache, which update_teacher/delete_teacher clear through
+    invalidate_principal.
+    """
+    if "teacher_id" in user:
+        return TeacherAccess(user["teacher_id"], user.get("subject_ids"))
+    access = teacher_access_cache.get(user["email"])
+    if access is None:
+        teacher = await teacher_cache.find_one(
+            database.teachers, {"email": user["email"]}, {"_id": 0, "id": 1, "subject_ids": 1}
+        )
+        if not teacher:
+            return None
+        access = TeacherAccess(teacher["id"], teacher.get("subject_ids"))
+        teacher_access_cache.set(user["email"], access)
+    return access
+
 def get_db():
     """Get database connection, attempting lazy initialization if needed"""
     global client, db, fs_bucket
@@ -187,6 +742,9 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class Student(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -288,23 +846,368 @@ class AnswerSheet(BaseModel):
     status: str = "pending"  # pending, checked
     marks_obtained: Optional[float] = None  # Changed from int to support half marks
     question_marks: List[QuestionMark] = []
-    annotations: List[Annotation] = []  # Store annotations for evaluation
+    # Annotations are stored per page by annotation_store; the sheet keeps counts
+    annotation_count: int = 0
+    annotation_counts: Dict[str, int] = {}  # page number -> annotations on that page
     remarks: Optional[str] = None
     checked_at: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+class StudentResult(BaseModel):
+    """One answer sheet as the student dashboard shows it (see transcripts.py)"""
+    model_config = ConfigDict(extra="ignore")
+    sheet_id: str
+    exam_id: str
+    exam_type: Optional[str] = None
+    exam_date: Optional[str] = None
+    total_marks: Optional[float] = None
+    subject_id: Optional[str] = None
+    subject_name: Optional[str] = None
+    status: str = "pending"
+    marks_obtained: Optional[float] = None
+    remarks: Optional[str] = None
+    checked_at: Optional[str] = None
+    created_at: Optional[str] = None
+
+class StudentResults(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    student: Student
+    results: List[StudentResult] = []
+    updated_at: str
+
+class QueueSheet(BaseModel):
+    """An assigned answer sheet with the student, exam and subject labels the teacher dashboard shows"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    exam_id: str
+    student_id: str
+    status: str = "pending"
+    marks_obtained: Optional[float] = None
+    question_marks: List[QuestionMark] = []
+    # PdfViewer only fetches the saved annotations of pages with a count
+    annotation_count: int = 0
+    annotation_counts: Dict[str, int] = {}
+    remarks: Optional[str] = None
+    checked_at: Optional[str] = None
+    created_at: Optional[str] = None
+    student_name: Optional[str] = None
+    roll_number: Optional[str] = None
+    exam_type: Optional[str] = None
+    total_marks: Optional[float] = None
+    subject_id: Optional[str] = None
+    subject_name: Optional[str] = None
+
+class QueueExam(BaseModel):
+    """An exam with sheets in the queue, and how many of them are pending and checked"""
+    exam_id: str
+    exam_type: Optional[str] = None
+    total_marks: Optional[float] = None
+    class_name: Optional[str] = None
+    questions: List[Question] = []
+    subject_id: Optional[str] = None
+    subject_name: Optional[str] = None
+    pending: int = 0
+    checked: int = 0
+
+class TeacherQueue(BaseModel):
+    sheets: List[QueueSheet] = []
+    exams: List[QueueExam] = []
+    pending: int = 0
+    checked: int = 0
+    subject_ids: List[str] = []
+
+class GradingProgress(BaseModel):
+    total: int = 0
+    pending: int = 0
+    checked: int = 0
+    oldest_pending_at: Optional[str] = None  # created_at of the longest-waiting pending sheet
+    oldest_pending_seconds: Optional[float] = None
+    average_marks: Optional[float] = None  # over checked sheets with marks
+
+class TeacherProgress(GradingProgress):
+    teacher_id: Optional[str] = None  # None for sheets not assigned to anyone
+    teacher_name: Optional[str] = None
+
+class ExamProgress(GradingProgress):
+    exam_id: str
+    exam_type: Optional[str] = None
+    subject_id: Optional[str] = None
+    total_marks: Optional[float] = None
+    teachers: List[TeacherProgress] = []
+    computed_at: str
+
 class MarkSubmission(BaseModel):
     question_marks: Optional[List[QuestionMark]] = None
     total_marks: Optional[float] = None  # Changed from int to support half marks
     annotations: Optional[List[Annotation]] = None  # Annotations from evaluation interface
     remarks: Optional[str] = None
 
+class AnswerSheetDraft(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    sheet_id: str
+    question_marks: List[QuestionMark] = []
+    total_marks: Optional[float] = None
+    annotations: List[Annotation] = []
+    remarks: Optional[str] = None
+    saved_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    # The sheet's checked_at when the draft was saved; a draft is only current while they match
+    sheet_checked_at: Optional[str] = None
+
+class AnnotationChange(BaseModel):
+    """Fields to change on an existing annotation; unset fields are left alone"""
+    id: str
+    type: Optional[str] = None
+    question_number: Optional[int] = None
+    x: Optional[float] = None
+    y: Optional[float] = None
+    page: Optional[int] = None
+    value: Optional[str] = None
+    marks: Optional[float] = None
+
+class AnnotationOps(BaseModel):
+    add: List[Annotation] = []
+    update: List[AnnotationChange] = []
+    remove: List[str] = []  # annotation ids
+
+class QuestionMarkOps(BaseModel):
+    set: List[QuestionMark] = []  # replaces any mark for the same question_number
+    remove: List[int] = []  # question numbers
+
+class DraftPatch(BaseModel):
+    annotations: AnnotationOps = AnnotationOps()
+    question_marks: QuestionMarkOps = QuestionMarkOps()
+    total_marks: Optional[float] = None
+    remarks: Optional[str] = None
+
+class SheetAssignment(BaseModel):
+    sheet_id: str
+    teacher_id: Optional[str] = None  # None unassigns the sheet
+
+class AssignmentFilter(BaseModel):
+    """Selects sheets the way they are stored; an explicit null assigned_teacher_id means unassigned"""
+    exam_id: Optional[str] = None
+    status: Optional[str] = None
+    assigned_teacher_id: Optional[str] = None
+
+class BulkAssignment(BaseModel):
+    """Either explicit (sheet, teacher) pairs, or every sheet matching `filter` to `teacher_id`"""
+    assignments: List[SheetAssignment] = []
+    filter: Optional[AssignmentFilter] = None
+    teacher_id: Optional[str] = None  # filter mode only, and required there; an explicit null unassigns
+
+class AssignmentResult(BaseModel):
+    sheet_id: str
+    teacher_id: Optional[str] = None
+    result: str  # assigned, unchanged, not_found, unknown_teacher
+
+class BulkAssignmentResult(BaseModel):
+    results: List[AssignmentResult] = []
+    assigned: int = 0
+    unchanged: int = 0
+    failed: int = 0
+
 # Helper functions
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+PAGE_SIZE_DEFAULT = 500
+PAGE_SIZE_MAX = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+def parse_cursor(after: Optional[str]) -> Optional[ObjectId]:
+    if not after:
+        return None
+    try:
+        return ObjectId(after)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_query(query: dict, after: Optional[str]) -> dict:
+    cursor = parse_cursor(after)
+    return {**query, "_id": {"$gt": cursor}} if cursor else query
+
+async def fetch_page(collection, query: dict, response: Response, after: Optional[str] = None,
+                     limit: Optional[int] = None, projection: Optional[dict] = None,
+                     cache: Optional[ReferenceCache] = None) -> List[dict]:
+    """One page of a list endpoint using keyset pagination on _id.
+
+    _id is always indexed and follows insertion order, so pages are stable
+    while new documents are added. When more documents remain, the cursor
+    for the next page is returned in the X-Next-Cursor header and is passed
+    back as `after`.
+    """
+    limit = min(max(limit or PAGE_SIZE_DEFAULT, 1), PAGE_SIZE_MAX)
+    projection = {k: v for k, v in (projection or {}).items() if k != "_id"} or None
+    # Fetch one extra document to learn whether another page exists
+    if cache:
+        docs = await cache.find(collection, query, projection, parse_cursor(after), limit + 1)
+    else:
+        docs = await collection.find(keyset_query(query, after), projection).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = str(docs[-1]["_id"])
+    for doc in docs:
+        doc.pop("_id", None)
+    return docs
+
+def stream_ndjson(collection, query: dict, model, after: Optional[str] = None,
+                  limit: Optional[int] = None, projection: Optional[dict] = None) -> StreamingResponse:
+    """Stream matching documents as newline-delimited JSON straight off the cursor.
+
+    Each document is validated against `model` on its own (sparse fieldsets
+    against just their fields), so memory stays constant and the first line
+    goes out as soon as the first batch arrives. Without a `limit` the whole
+    result set is streamed.
+    """
+    query = keyset_query(query, after)
+    cursor = collection.find(query, {k: v for k, v in (projection or {}).items() if k != "_id"} or None)
+    cursor = cursor.sort("_id", 1).batch_size(200)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    async def lines():
+        try:
+            line_model = sparse_model(model, tuple(projection)) if projection else model
+            async for doc in cursor:
+                doc.pop("_id", None)
+                yield line_model.model_validate(doc).model_dump_json() + "\n"
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+# Heavy fields left out of list responses unless asked for with `fields=`
+LIST_SUMMARY_EXCLUDE = {
+    AnswerSheet: {"question_marks"},
+}
+
+def resolve_projection(model, fields: Optional[str], summary: bool) -> Optional[dict]:
+    """Mongo projection for a `fields=` sparse fieldset.
+
+    `fields` is a comma-separated list of model fields; `summary` expands to
+    the model's list summary and `*` asks for every field. Without `fields`,
+    list endpoints (`summary=True`) get the summary. Returns None when the
+    whole document should be returned and validated by the response model.
+    """
+    summary_fields = set(model.model_fields) - LIST_SUMMARY_EXCLUDE.get(model, set())
+    if fields is None:
+        if not summary or summary_fields == set(model.model_fields):
+            return None
+        selected = set(summary_fields)
+    else:
+        selected = set()
+        for name in (f.strip() for f in fields.split(",")):
+            if not name:
+                continue
+            if name == "*":
+                return None
+            if name == "summary":
+                selected |= summary_fields
+            elif name in model.model_fields:
+                selected.add(name)
+            else:
+                raise HTTPException(status_code=400, detail=f"Unknown field: {name}")
+    selected.add("id")
+    return {name: 1 for name in sorted(selected)}
+
+@functools.lru_cache(maxsize=256)
+def sparse_model(model, names: Tuple[str, ...]):
+    """A model with only the `names` fields of `model`, defaults and constraints included"""
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__=model.model_config,
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in names},
+    )
+
+def sparse_response(content, model, projection: Optional[dict], headers: Optional[dict] = None):
+    """Partial documents can't pass the response model; validate them against just the selected fields"""
+    if projection is None:
+        return content
+    partial = sparse_model(model, tuple(projection))
+    if isinstance(content, list):
+        content = [partial.model_validate(doc).model_dump(mode="json") for doc in content]
+    else:
+        content = partial.model_validate(content).model_dump(mode="json")
+    return JSONResponse(content=content, headers=headers)
+
+# Browsers keep the response but check it with If-None-Match before every reuse
+VALIDATED_CACHE_CONTROL = "private, no-cache"
+
+def content_etag(content, *parts) -> str:
+    """Weak validator for a response built from `content` as stored.
+
+    Hashing the documents the query returned (rather than keeping version
+    counters) means every writer, script and worker invalidates it for free,
+    and a response that differs by user or `fields=` gets its own tag.
+    """
+    digest = hashlib.blake2b(encode_bson({"content": content, "parts": list(parts)}), digest_size=16)
+    return f'W/"{digest.hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check using weak comparison (RFC 9110 13.1.2)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def conditional_response(request: Request, response: Response, content, model, projection: Optional[dict], *parts):
+    """Tag a read response; answer 304 without validating or serializing when the client's copy is current"""
+    headers = {"ETag": content_etag(content, *parts), "Cache-Control": VALIDATED_CACHE_CONTROL}
+    next_cursor = response.headers.get("X-Next-Cursor")
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return sparse_response(content, model, projection, headers)
+
+async def list_documents(request: Request, response: Response, collection, query: dict, model,
+                         after: Optional[str] = None, limit: Optional[int] = None,
+                         fields: Optional[str] = None, cache: Optional[ReferenceCache] = None):
+    """Serve a list endpoint as a JSON page, or as an NDJSON stream when asked for"""
+    projection = resolve_projection(model, fields, summary=True)
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return stream_ndjson(collection, query, model, after, limit, projection)
+    docs = await fetch_page(collection, query, response, after, limit, projection, cache)
+    # The next-page cursor is part of the response, so it is part of the tag
+    return conditional_response(request, response, docs, model, projection, response.headers.get("X-Next-Cursor"))
+
+async def find_by_id(request: Request, response: Response, collection, doc_id: str, model,
+                     fields: Optional[str], not_found: str, cache: Optional[ReferenceCache] = None):
+    """Detail lookup honouring `fields=`; detail endpoints default to every field"""
+    projection = resolve_projection(model, fields, summary=False)
+    query = {"id": doc_id}
+    stored_fields = {"_id": 0, **(projection or {})}
+    if cache:
+        doc = await cache.find_one(collection, query, stored_fields)
+    else:
+        doc = await collection.find_one(query, stored_fields)
+    if not doc:
+        raise HTTPException(status_code=404, detail=not_found)
+    return conditional_response(request, response, doc, model, projection)
+
+async def best_effort(awaitable, what: str):
+    """Await a lookup whose failure must not fail the request; None on error"""
+    try:
+        return await awaitable
+    except Exception as e:
+        logger.error(f"Failed to {what}: {e}", exc_info=True)
+        return None
+
+async def put_transcript_entry(sheet: dict, exam: Optional[dict] = None, subject: Optional[dict] = None):
+    """Record a sheet's current state in its student's transcript; exam and subject default to the cached ones"""
+    if exam is None:
+        exam = await exam_cache.find_one(db.exams, {"id": sheet["exam_id"]}, {"_id": 0})
+    if subject is None and exam:
+        subject = await subject_cache.find_one(db.subjects, {"id": exam["subject_id"]}, {"_id": 0})
+    await transcripts.put_entry(db, sheet["student_id"], transcripts.result_entry(sheet, exam, subject))
+
+async def delete_gridfs_file(file_id: str):
+    """Delete a stored PDF; a file that is already gone is fine"""
+    try:
+        await fs_bucket.delete(ObjectId(file_id))
+    except Exception:
+        pass
 
 async def persist_student_mark_to_excel(student: dict, subject: dict, exam: dict, marks_obtained: Optional[float]):
     from openpyxl import Workbook, load_workbook
@@ -460,18 +1363,22 @@ async def register(user_data: UserCreate, database = Depends(get_database)):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_dict = user_data.model_dump()
-    hashed_pwd = hash_password(user_dict.pop('password'))
+    hashed_pwd = await password_service.hash(user_dict.pop('password'))
     user_dict['password_hash'] = hashed_pwd
     
     user_obj = User(**{k: v for k, v in user_dict.items() if k != 'password_hash'})
     doc = user_obj.model_dump()
     doc['password_hash'] = hashed_pwd
+    # Start above any revocation left behind by a deleted account with this email
+    revocation = await database.token_revocations.find_one({"email": user_data.email}, {"_id": 0, "min_version": 1})
+    doc['token_version'] = revocation["min_version"] if revocation else 0
     
     await database.users.insert_one(doc)
     return user_obj
 
 @api_router.post("/auth/login")
-async def login(login_data: LoginRequest, database = Depends(get_database)):
+async def login(login_data: LoginRequest, request: Request, database = Depends(get_database)):
+    login_admission.check_rate(client_ip(request), login_data.email)
     try:
         user = await database.users.find_one({"email": login_data.email}, {"_id": 0})
     except Exception as e:
@@ -485,13 +1392,85 @@ async def login(login_data: LoginRequest, database = Depends(get_database)):
         logger.warning(f"Login attempt with non-existent email: {login_data.email}")
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(login_data.password, user['password_hash']):
+    if not await login_admission.verify(login_data.password, user['password_hash']):
         logger.warning(f"Login attempt with wrong password for email: {login_data.email}")
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     user.pop('password_hash', None)
-    token = create_access_token({"sub": user["email"], "role": user["role"]})
-    return {"user": user, "token": token, "message": "Login successful"}
+    token = create_access_token(await build_token_claims(user, database))
+    refresh_token = await issue_refresh_token(database, user["email"])
+    return {"user": user, "token": token, "refresh_token": refresh_token, "message": "Login successful"}
+
+def hash_refresh_token(token: str) -> str:
+    return hmac.new(JWT_SECRET.encode('utf-8'), token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+async def issue_refresh_token(database, email: str, family_id: Optional[str] = None) -> str:
+    """Create an opaque refresh token; only its HMAC is stored"""
+    token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    await database.refresh_tokens.insert_one({
+        "token_hash": hash_refresh_token(token),
+        "email": email,
+        # All tokens rotated from the same login share a family
+        "family_id": family_id or str(uuid.uuid4()),
+        "revoked": False,
+        "created_at": now,
+        "expires_at": now + timedelta(days=REFRESH_TOKEN_DAYS),
+    })
+    return token
+
+@api_router.post("/auth/refresh")
+async def refresh_access_token(refresh_data: RefreshRequest, database = Depends(get_database)):
+    token_hash = hash_refresh_token(refresh_data.refresh_token)
+    now = datetime.now(timezone.utc)
+    # Consume the presented token atomically so each one can be used only once
+    record = await database.refresh_tokens.find_one_and_update(
+        {"token_hash": token_hash, "revoked": False, "expires_at": {"$gt": now}},
+        {"$set": {"revoked": True, "rotated_at": now}},
+        projection={"_id": 0, "email": 1, "family_id": 1},
+    )
+    if not record:
+        replayed = await database.refresh_tokens.find_one(
+            {"token_hash": token_hash, "rotated_at": {"$exists": True}},
+            {"_id": 0, "email": 1, "family_id": 1, "rotated_at": 1},
+        )
+        if not replayed:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+        rotated_at = replayed["rotated_at"]
+        if rotated_at.tzinfo is None:
+            rotated_at = rotated_at.replace(tzinfo=timezone.utc)
+        # Within the grace window, and while the login is still live (its successor
+        # not revoked by logout or an earlier reuse), this is another tab or a retry
+        # that lost the race: give it a successor of its own in the same family.
+        live_family = now - rotated_at <= timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS) and (
+            await database.refresh_tokens.find_one(
+                {"family_id": replayed["family_id"], "revoked": False, "expires_at": {"$gt": now}}, {"_id": 1}
+            )
+        )
+        if not live_family:
+            # A rotated token came back: assume it leaked and end that login's session
+            logger.warning(f"Refresh token reuse detected for email: {replayed['email']}")
+            await database.refresh_tokens.update_many({"family_id": replayed["family_id"]}, {"$set": {"revoked": True}})
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+        record = replayed
+
+    user = await database.users.find_one({"email": record["email"]}, {"_id": 0, "password_hash": 0})
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    token = create_access_token(await build_token_claims(user, database))
+    refresh_token = await issue_refresh_token(database, user["email"], record["family_id"])
+    return {"user": user, "token": token, "refresh_token": refresh_token}
+
+@api_router.post("/auth/logout")
+async def logout(refresh_data: RefreshRequest, database = Depends(get_database)):
+    record = await database.refresh_tokens.find_one(
+        {"token_hash": hash_refresh_token(refresh_data.refresh_token)},
+        {"_id": 0, "family_id": 1},
+    )
+    if record:
+        await database.refresh_tokens.update_many({"family_id": record["family_id"]}, {"$set": {"revoked": True}})
+    return {"message": "Logged out"}
 
 # Student routes
 @api_router.post("/students", response_model=Student)
@@ -514,6 +1493,7 @@ async def create_student(student_data: StudentCreate):
     doc = student_obj.model_dump()
     
     await db.students.insert_one(doc)
+    await bump_stats(db, students=1)
     
     # Also create user account
     user_data = UserCreate(
@@ -522,49 +1502,62 @@ async def create_student(student_data: StudentCreate):
         password=password,
         role="student"
     )
-    await register(user_data)
+    await register(user_data, db)
     
     return student_obj
 
 @api_router.get("/students", response_model=List[Student])
-async def get_students(class_name: Optional[str] = None, semester: Optional[str] = None):
+async def get_students(
+    request: Request,
+    response: Response,
+    class_name: Optional[str] = None,
+    semester: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = None,
+):
     """Get all students, optionally filtered by class_name (SY, TY, BE) or semester"""
     query = {}
     if class_name:
         query["class_name"] = class_name
     if semester:
         query["semester"] = semester
-    students = await db.students.find(query, {"_id": 0}).to_list(1000)
-    return students
+    return await list_documents(request, response, db.students, query, Student, after, limit, fields)
 
 @api_router.get("/students/{student_id}", response_model=Student)
-async def get_student(student_id: str):
-    student = await db.students.find_one({"id": student_id}, {"_id": 0})
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    return student
+async def get_student(request: Request, response: Response, student_id: str, fields: Optional[str] = None):
+    return await find_by_id(request, response, db.students, student_id, Student, fields, "Student not found")
 
 @api_router.put("/students/{student_id}", response_model=Student)
 async def update_student(student_id: str, student_data: StudentCreate):
-    existing = await db.students.find_one({"id": student_id}, {"_id": 0})
+    update_dict = student_data.model_dump(exclude={'password'})
+    # The pre-image tells us whether the login needs revoking; with a plain
+    # $set the post-image is just the pre-image plus the new values.
+    existing = await db.students.find_one_and_update(
+        {"id": student_id},
+        {"$set": update_dict},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
     if not existing:
         raise HTTPException(status_code=404, detail="Student not found")
+    if update_dict.get("email") != existing.get("email"):
+        await revoke_tokens(db, existing.get("email"))
+    invalidate_principal(existing.get("email"), update_dict.get("email"))
+    await best_effort(transcripts.set_student(db, student_id, update_dict), "update student transcript")
     
-    update_dict = student_data.model_dump(exclude={'password'})
-    await db.students.update_one({"id": student_id}, {"$set": update_dict})
-    
-    updated = await db.students.find_one({"id": student_id}, {"_id": 0})
-    return updated
+    return {**existing, **update_dict}
 
 @api_router.delete("/students/{student_id}")
 async def delete_student(student_id: str):
-    result = await db.students.delete_one({"id": student_id})
-    if result.deleted_count == 0:
+    student = await db.students.find_one_and_delete({"id": student_id}, {"_id": 0})
+    if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    student = await db.students.find_one({"id": student_id}, {"_id": 0})
-    if student:
-        await db.users.delete_one({"email": student.get('email')})
+    await bump_stats(db, students=-1)
+    await revoke_tokens(db, student.get('email'), end_sessions=True)
+    await db.users.delete_one({"email": student.get('email')})
+    await best_effort(transcripts.delete_transcript(db, student_id), "delete student transcript")
     
     return {"message": "Student deleted successfully"}
 
@@ -582,6 +1575,8 @@ async def create_teacher(teacher_data: TeacherCreate):
     doc = teacher_obj.model_dump()
     
     await db.teachers.insert_one(doc)
+    teacher_cache.put(doc)
+    await bump_stats(db, teachers=1)
     
     user_data = UserCreate(
         name=teacher_data.name,
@@ -589,43 +1584,58 @@ async def create_teacher(teacher_data: TeacherCreate):
         password=password,
         role="teacher"
     )
-    await register(user_data)
+    await register(user_data, db)
     
     return teacher_obj
 
 @api_router.get("/teachers", response_model=List[Teacher])
-async def get_teachers():
-    teachers = await db.teachers.find({}, {"_id": 0}).to_list(1000)
-    return teachers
+async def get_teachers(
+    request: Request,
+    response: Response,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = None,
+):
+    return await list_documents(request, response, db.teachers, {}, Teacher, after, limit, fields, teacher_cache)
 
 @api_router.get("/teachers/{teacher_id}", response_model=Teacher)
-async def get_teacher(teacher_id: str):
-    teacher = await db.teachers.find_one({"id": teacher_id}, {"_id": 0})
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher not found")
-    return teacher
+async def get_teacher(request: Request, response: Response, teacher_id: str, fields: Optional[str] = None):
+    return await find_by_id(request, response, db.teachers, teacher_id, Teacher, fields, "Teacher not found",
+                            teacher_cache)
 
 @api_router.put("/teachers/{teacher_id}", response_model=Teacher)
 async def update_teacher(teacher_id: str, teacher_data: TeacherCreate):
-    existing = await db.teachers.find_one({"id": teacher_id}, {"_id": 0})
+    update_dict = teacher_data.model_dump(exclude={'password'})
+    # The pre-image tells us whether the login needs revoking; with a plain
+    # $set the post-image is just the pre-image plus the new values.
+    existing = await db.teachers.find_one_and_update(
+        {"id": teacher_id},
+        {"$set": update_dict},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
     if not existing:
         raise HTTPException(status_code=404, detail="Teacher not found")
+    if (update_dict.get("email") != existing.get("email")
+            or set(update_dict.get("subject_ids") or []) != set(existing.get("subject_ids") or [])):
+        # Teacher tokens carry subject_ids, so stale claims must be cut off
+        await revoke_tokens(db, existing.get("email"))
+    invalidate_principal(existing.get("email"), update_dict.get("email"))
+    updated = {**existing, **update_dict}
+    teacher_cache.put(updated)
     
-    update_dict = teacher_data.model_dump(exclude={'password'})
-    await db.teachers.update_one({"id": teacher_id}, {"$set": update_dict})
-    
-    updated = await db.teachers.find_one({"id": teacher_id}, {"_id": 0})
     return updated
 
 @api_router.delete("/teachers/{teacher_id}")
 async def delete_teacher(teacher_id: str):
-    result = await db.teachers.delete_one({"id": teacher_id})
-    if result.deleted_count == 0:
+    teacher = await db.teachers.find_one_and_delete({"id": teacher_id}, {"_id": 0})
+    if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
+    teacher_cache.discard(teacher_id)
     
-    teacher = await db.teachers.find_one({"id": teacher_id}, {"_id": 0})
-    if teacher:
-        await db.users.delete_one({"email": teacher.get('email')})
+    await bump_stats(db, teachers=-1)
+    await revoke_tokens(db, teacher.get('email'), end_sessions=True)
+    await db.users.delete_one({"email": teacher.get('email')})
     
     return {"message": "Teacher deleted successfully"}
 
@@ -635,32 +1645,44 @@ async def create_subject(subject_data: SubjectCreate):
     subject_obj = Subject(**subject_data.model_dump())
     doc = subject_obj.model_dump()
     await db.subjects.insert_one(doc)
+    subject_cache.put(doc)
+    await bump_stats(db, subjects=1)
     return subject_obj
 
 @api_router.get("/subjects", response_model=List[Subject])
-async def get_subjects(class_name: Optional[str] = None):
+async def get_subjects(
+    request: Request,
+    response: Response,
+    class_name: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = None,
+):
     """Retrieve subjects, optionally filtered by class/year."""
     query = {}
     if class_name:
         query["class_name"] = class_name
-    subjects = await db.subjects.find(query, {"_id": 0}).to_list(1000)
-    return subjects
+    return await list_documents(request, response, db.subjects, query, Subject, after, limit, fields, subject_cache)
 
 @api_router.get("/subjects/{subject_id}", response_model=Subject)
-async def get_subject(subject_id: str):
-    subject = await db.subjects.find_one({"id": subject_id}, {"_id": 0})
-    if not subject:
-        raise HTTPException(status_code=404, detail="Subject not found")
-    return subject
+async def get_subject(request: Request, response: Response, subject_id: str, fields: Optional[str] = None):
+    return await find_by_id(request, response, db.subjects, subject_id, Subject, fields, "Subject not found",
+                            subject_cache)
 
 @api_router.put("/subjects/{subject_id}", response_model=Subject)
 async def update_subject(subject_id: str, subject_data: SubjectCreate):
     update_dict = subject_data.model_dump()
-    result = await db.subjects.update_one({"id": subject_id}, {"$set": update_dict})
-    if result.matched_count == 0:
+    updated = await db.subjects.find_one_and_update(
+        {"id": subject_id},
+        {"$set": update_dict},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated:
         raise HTTPException(status_code=404, detail="Subject not found")
-    
-    updated = await db.subjects.find_one({"id": subject_id}, {"_id": 0})
+    subject_cache.put(updated)
+    # Subject names copied into student transcripts
+    await best_effort(transcripts.update_subject(db, updated), "update subject in student transcripts")
     return updated
 
 @api_router.delete("/subjects/{subject_id}")
@@ -668,6 +1690,8 @@ async def delete_subject(subject_id: str):
     result = await db.subjects.delete_one({"id": subject_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Subject not found")
+    subject_cache.discard(subject_id)
+    await bump_stats(db, subjects=-1)
     return {"message": "Subject deleted successfully"}
 
 # Exam routes
@@ -676,10 +1700,19 @@ async def create_exam(exam_data: ExamCreate):
     exam_obj = Exam(**exam_data.model_dump())
     doc = exam_obj.model_dump()
     await db.exams.insert_one(doc)
+    exam_cache.put(doc)
+    await bump_stats(db, exams=1)
     return exam_obj
 
 @api_router.get("/exams", response_model=List[Exam])
-async def get_exams(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))):
+async def get_exams(
+    request: Request,
+    response: Response,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+):
     # Try to get current user if token provided
     user = None
     if credentials:
@@ -690,33 +1723,167 @@ async def get_exams(credentials: Optional[HTTPAuthorizationCredentials] = Depend
     
     # If teacher, filter exams by their assigned subjects
     if user and user.get("role") == "teacher":
-        teacher = await db.teachers.find_one({"email": user["email"]}, {"_id": 0})
-        if teacher and teacher.get("subject_ids"):
-            exams = await db.exams.find(
-                {"subject_id": {"$in": teacher["subject_ids"]}}, 
-                {"_id": 0}
-            ).to_list(1000)
-            return exams
+        access = await get_teacher_access(user, db)
+        if access and access.subject_ids:
+            return await list_documents(
+                request, response, db.exams, {"subject_id": {"$in": sorted(access.subject_ids)}}, Exam, after, limit,
+                fields, exam_cache,
+            )
     
     # Admin or no auth - return all exams
-    exams = await db.exams.find({}, {"_id": 0}).to_list(1000)
-    return exams
+    return await list_documents(request, response, db.exams, {}, Exam, after, limit, fields, exam_cache)
+
+# Grading progress
+# Declared ahead of /exams/{exam_id}, which would otherwise take "progress" for an exam id.
+PROGRESS_CACHE_TTL = float(os.environ.get("PROGRESS_CACHE_TTL", "10"))
+PROGRESS_MAX_EXAMS = 100
+# exam id -> progress as last aggregated; everyone watching an exam shares one aggregation per TTL
+progress_cache = TTLCache(maxsize=REFERENCE_CACHE_SIZE, ttl=PROGRESS_CACHE_TTL)
+
+_PENDING = {"$eq": ["$status", "pending"]}
+_CHECKED = {"$eq": ["$status", "checked"]}
+# One group per (exam, assigned teacher); exam totals are summed from these in Python
+PROGRESS_GROUP = {
+    "_id": {"exam_id": "$exam_id", "teacher_id": "$assigned_teacher_id"},
+    "total": {"$sum": 1},
+    "pending": {"$sum": {"$cond": [_PENDING, 1, 0]}},
+    "checked": {"$sum": {"$cond": [_CHECKED, 1, 0]}},
+    # $min skips the nulls the other sheets yield
+    "oldest_pending_at": {"$min": {"$cond": [_PENDING, "$created_at", None]}},
+    # Sums rather than $avg, so the per-exam average can be combined exactly
+    "marks_sum": {"$sum": {"$cond": [_CHECKED, "$marks_obtained", 0]}},
+    # Any number sorts above null; a missing or null mark does not
+    "marked": {"$sum": {"$cond": [{"$and": [_CHECKED, {"$gt": ["$marks_obtained", None]}]}, 1, 0]}},
+}
+
+async def aggregate_progress(exam_ids: List[str]) -> Dict[str, List[dict]]:
+    """exam id -> its per-teacher groups, from one pipeline matched on the exam_id index"""
+    groups = await db.answer_sheets.aggregate([
+        {"$match": {"exam_id": {"$in": exam_ids}}},
+        {"$group": PROGRESS_GROUP},
+    ]).to_list(None)
+    by_exam = {exam_id: [] for exam_id in exam_ids}
+    for group in groups:
+        key = group.pop("_id")
+        by_exam[key["exam_id"]].append({"teacher_id": key.get("teacher_id"), **group})
+    return by_exam
+
+def seconds_since(timestamp: Optional[str], now: datetime) -> Optional[float]:
+    if not timestamp:
+        return None
+    try:
+        then = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    if then.tzinfo is None:
+        then = then.replace(tzinfo=timezone.utc)
+    return round((now - then).total_seconds(), 1)
 
-@api_router.get("/exams/{exam_id}", response_model=Exam)
-async def get_exam(exam_id: str):
-    exam = await db.exams.find_one({"id": exam_id}, {"_id": 0})
+def summarize_progress(groups: List[dict], now: datetime) -> dict:
+    oldest = min((group["oldest_pending_at"] for group in groups if group["oldest_pending_at"]), default=None)
+    marked = sum(group["marked"] for group in groups)
+    return {
+        "total": sum(group["total"] for group in groups),
+        "pending": sum(group["pending"] for group in groups),
+        "checked": sum(group["checked"] for group in groups),
+        "oldest_pending_at": oldest,
+        "oldest_pending_seconds": seconds_since(oldest, now),
+        "average_marks": round(sum(group["marks_sum"] for group in groups) / marked, 2) if marked else None,
+    }
+
+async def exam_progress(exams: List[dict]) -> List[dict]:
+    """Progress for each exam, in order; exams not cached are aggregated together in one pipeline"""
+    progress = {exam["id"]: progress_cache.get(exam["id"]) for exam in exams}
+    stale = [exam for exam in exams if progress[exam["id"]] is None]
+    if stale:
+        groups = await aggregate_progress([exam["id"] for exam in stale])
+        teacher_ids = {group["teacher_id"] for exam_groups in groups.values() for group in exam_groups}
+        teachers = await teacher_cache.find(
+            db.teachers, {"id": {"$in": [t for t in teacher_ids if t]}}, {"_id": 0, "id": 1, "name": 1}
+        )
+        teacher_names = {teacher["id"]: teacher.get("name") for teacher in teachers}
+        now = datetime.now(timezone.utc)
+        for exam in stale:
+            exam_groups = groups[exam["id"]]
+            by_teacher = [
+                {"teacher_id": group["teacher_id"], "teacher_name": teacher_names.get(group["teacher_id"]),
+                 **summarize_progress([group], now)}
+                for group in exam_groups
+            ]
+            # Longest backlog first
+            by_teacher.sort(key=lambda row: (-row["pending"], row["teacher_name"] or ""))
+            progress[exam["id"]] = {
+                "exam_id": exam["id"],
+                "exam_type": exam.get("exam_type"),
+                "subject_id": exam.get("subject_id"),
+                "total_marks": exam.get("total_marks"),
+                **summarize_progress(exam_groups, now),
+                "teachers": by_teacher,
+                "computed_at": now.isoformat(),
+            }
+            progress_cache.set(exam["id"], progress[exam["id"]])
+    return [progress[exam["id"]] for exam in exams]
+
+@api_router.get("/exams/progress", response_model=List[ExamProgress])
+async def get_exams_progress(
+    request: Request,
+    response: Response,
+    exam_ids: str = Query(..., description="Comma-separated exam ids"),
+    current_user: dict = Depends(require_role("admin", "teacher")),
+):
+    """Grading progress of several exams; teachers only get the exams of their subjects"""
+    ids = list(dict.fromkeys(exam_id.strip() for exam_id in exam_ids.split(",") if exam_id.strip()))
+    if not ids:
+        raise HTTPException(status_code=400, detail="No exam ids given")
+    if len(ids) > PROGRESS_MAX_EXAMS:
+        raise HTTPException(status_code=400, detail=f"At most {PROGRESS_MAX_EXAMS} exams at a time")
+    exams = await exam_cache.find(db.exams, {"id": {"$in": ids}}, {"_id": 0})
+    if current_user["role"] == "teacher":
+        access = await get_teacher_access(current_user, db)
+        exams = [exam for exam in exams if access and access.may_access_exam(exam)]
+    position = {exam_id: i for i, exam_id in enumerate(ids)}
+    exams.sort(key=lambda exam: position[exam["id"]])
+    return conditional_response(request, response, await exam_progress(exams), ExamProgress, None)
+
+@api_router.get("/exams/{exam_id}/progress", response_model=ExamProgress)
+async def get_exam_progress(
+    request: Request,
+    response: Response,
+    exam_id: str,
+    current_user: dict = Depends(require_role("admin", "teacher")),
+):
+    """Grading progress of one exam: totals, then per assigned teacher"""
+    exam = await exam_cache.find_one(db.exams, {"id": exam_id}, {"_id": 0})
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
-    return exam
+    if current_user["role"] == "teacher":
+        access = await get_teacher_access(current_user, db)
+        if not access:
+            raise HTTPException(status_code=404, detail="Teacher profile not found")
+        if not access.may_access_exam(exam):
+            raise HTTPException(status_code=403, detail="Not allowed for non-assigned subjects")
+    [progress] = await exam_progress([exam])
+    return conditional_response(request, response, progress, ExamProgress, None)
+
+@api_router.get("/exams/{exam_id}", response_model=Exam)
+async def get_exam(request: Request, response: Response, exam_id: str, fields: Optional[str] = None):
+    return await find_by_id(request, response, db.exams, exam_id, Exam, fields, "Exam not found", exam_cache)
 
 @api_router.put("/exams/{exam_id}", response_model=Exam)
 async def update_exam(exam_id: str, exam_data: ExamCreate):
     update_dict = exam_data.model_dump()
-    result = await db.exams.update_one({"id": exam_id}, {"$set": update_dict})
-    if result.matched_count == 0:
+    subject = await subject_cache.find_one(db.subjects, {"id": update_dict["subject_id"]}, {"_id": 0})
+    updated = await db.exams.find_one_and_update(
+        {"id": exam_id},
+        {"$set": update_dict},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated:
         raise HTTPException(status_code=404, detail="Exam not found")
-    
-    updated = await db.exams.find_one({"id": exam_id}, {"_id": 0})
+    exam_cache.put(updated)
+    # Exam details copied into student transcripts
+    await best_effort(transcripts.update_exam(db, updated, subject), "update exam in student transcripts")
     return updated
 
 @api_router.delete("/exams/{exam_id}")
@@ -724,6 +1891,8 @@ async def delete_exam(exam_id: str):
     result = await db.exams.delete_one({"id": exam_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Exam not found")
+    exam_cache.discard(exam_id)
+    await bump_stats(db, exams=-1)
     return {"message": "Exam deleted successfully"}
 
 # Answer Sheet routes
@@ -744,18 +1913,26 @@ async def upload_answer_sheet(
 
     # If teacher, validate they can upload for this exam's subject and auto-assign them
     if current_user["role"] == "teacher":
-        # Get exam details
-        exam = await db.exams.find_one({"id": exam_id}, {"_id": 0})
+        # Exam and teacher access normally come from memory; on a cache miss
+        # they load alongside the duplicate check
+        exam, access, existing_checked = await asyncio.gather(
+            exam_cache.find_one(db.exams, {"id": exam_id}, {"_id": 0, "subject_id": 1}),
+            get_teacher_access(current_user, db),
+            # Prevent uploading if a checked sheet already exists for this exam and student
+            db.answer_sheets.find_one({
+                "exam_id": exam_id,
+                "student_id": student_id,
+                "status": "checked",
+            }, {"_id": 0, "id": 1}),
+        )
         if not exam:
             raise HTTPException(status_code=404, detail="Exam not found")
-        
-        # Get teacher details
-        teacher = await db.teachers.find_one({"email": current_user["email"]}, {"_id": 0})
-        if not teacher:
+
+        if not access:
             raise HTTPException(status_code=404, detail="Teacher profile not found")
         
         # Check if teacher teaches this subject
-        if exam["subject_id"] not in teacher.get("subject_ids", []):
+        if not access.may_access_exam(exam):
             raise HTTPException(
                 status_code=403, 
                 detail="You can only upload answer sheets for exams related to your assigned subjects"
@@ -763,14 +1940,8 @@ async def upload_answer_sheet(
         
         # Auto-assign the uploading teacher if no teacher was specified
         if not assigned_teacher_id:
-            assigned_teacher_id = teacher["id"]
+            assigned_teacher_id = access.teacher_id
 
-        # Prevent uploading if a checked sheet already exists for this exam and student
-        existing_checked = await db.answer_sheets.find_one({
-            "exam_id": exam_id,
-            "student_id": student_id,
-            "status": "checked",
-        }, {"_id": 0})
         if existing_checked:
             raise HTTPException(status_code=403, detail="Upload blocked: paper already checked. Contact admin.")
 
@@ -792,16 +1963,26 @@ async def upload_answer_sheet(
         assigned_teacher_id=assigned_teacher_id,
     )
     doc = answer_sheet.model_dump()
-    await db.answer_sheets.insert_one(doc)
+    # A counter bumped for an insert that then fails is corrected by reconciliation
+    await asyncio.gather(
+        db.answer_sheets.insert_one(doc),
+        bump_stats(db, answer_sheets=1, pending_sheets=1),
+    )
+    # Only once the sheet exists; the next grading rewrites the entry if this fails
+    await best_effort(put_transcript_entry(doc), "add sheet to student transcript")
 
     return answer_sheet
 
 @api_router.get("/answer-sheets", response_model=List[AnswerSheet])
 async def get_answer_sheets(
+    request: Request,
+    response: Response,
     teacher_id: Optional[str] = None, 
     student_id: Optional[str] = None,
     status: Optional[str] = None,
-    limit: Optional[int] = 1000
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = None,
 ):
     query = {}
     if teacher_id:
@@ -811,23 +1992,27 @@ async def get_answer_sheets(
     if status:
         query["status"] = status
     
-    # Add projection to exclude heavy fields if not needed
-    projection = {"_id": 0}
-    
-    answer_sheets = await db.answer_sheets.find(query, projection).limit(limit).to_list(limit)
-    return answer_sheets
+    return await list_documents(request, response, db.answer_sheets, query, AnswerSheet, after, limit, fields)
 
 @api_router.get("/answer-sheets/{sheet_id}", response_model=AnswerSheet)
-async def get_answer_sheet(sheet_id: str, mask_identity: bool = False):
+async def get_answer_sheet(
+    request: Request,
+    response: Response,
+    sheet_id: str,
+    mask_identity: bool = False,
+    fields: Optional[str] = None,
+):
     """
     Get answer sheet details.
     If mask_identity is True, student_id is still returned but frontend should mask it.
     """
-    sheet = await db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0})
-    if not sheet:
-        raise HTTPException(status_code=404, detail="Answer sheet not found")
     # Note: We still return student_id for backend operations, but frontend will mask it
-    return sheet
+    return await find_by_id(request, response, db.answer_sheets, sheet_id, AnswerSheet, fields, "Answer sheet not found")
+
+@api_router.get("/answer-sheets/{sheet_id}/annotations", response_model=List[Annotation])
+async def get_answer_sheet_annotations(sheet_id: str, page: Optional[int] = Query(None, ge=1)):
+    """Saved annotations of one page (as the PDF viewer renders it), or of the whole sheet"""
+    return await annotation_store.load_annotations(db, sheet_id, page)
 
 @api_router.get("/answer-sheets/{sheet_id}/download")
 async def download_answer_sheet(sheet_id: str):
@@ -862,24 +2047,98 @@ async def download_answer_sheet(sheet_id: str):
 
 @api_router.put("/answer-sheets/{sheet_id}/assign")
 async def assign_answer_sheet(sheet_id: str, teacher_id: str = Form(...)):
-    result = await db.answer_sheets.update_one(
+    updated = await db.answer_sheets.find_one_and_update(
         {"id": sheet_id},
-        {"$set": {"assigned_teacher_id": teacher_id}}
+        {"$set": {"assigned_teacher_id": teacher_id}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
     )
-    if result.matched_count == 0:
+    if not updated:
         raise HTTPException(status_code=404, detail="Answer sheet not found")
-    
-    updated = await db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0})
     return updated
 
+BULK_ASSIGN_MAX = 5000
+
+@api_router.post("/answer-sheets/assign", response_model=BulkAssignmentResult)
+async def bulk_assign_answer_sheets(body: BulkAssignment, current_user: dict = Depends(require_role("admin"))):
+    """Assign many sheets in one request, reporting what happened to each.
+
+    One read learns which sheets exist and who has them; every change then
+    goes out in a single bulk_write, one UpdateMany per target teacher.
+    """
+    if body.filter is not None:
+        if body.assignments:
+            raise HTTPException(status_code=400, detail="Send either assignments or a filter, not both")
+        query = body.filter.model_dump(exclude_unset=True)
+        if not query:
+            raise HTTPException(status_code=400, detail="The filter needs at least one field")
+        # A missing teacher_id must not silently unassign every matching sheet
+        if "teacher_id" not in body.model_fields_set:
+            raise HTTPException(status_code=400, detail="A filter needs a teacher_id (null to unassign)")
+    else:
+        if not body.assignments:
+            raise HTTPException(status_code=400, detail="No assignments given")
+        if "teacher_id" in body.model_fields_set:
+            raise HTTPException(status_code=400, detail="teacher_id goes on each assignment, not on the request")
+        targets = {}
+        for item in body.assignments:
+            if item.sheet_id in targets:
+                raise HTTPException(status_code=400, detail=f"Sheet {item.sheet_id} is listed more than once")
+            targets[item.sheet_id] = item.teacher_id
+        if len(targets) > BULK_ASSIGN_MAX:
+            raise HTTPException(status_code=400, detail=f"At most {BULK_ASSIGN_MAX} sheets at a time")
+        query = {"id": {"$in": list(targets)}}
+
+    teacher_ids = {body.teacher_id} if body.filter is not None else set(targets.values())
+    sheets, teachers = await asyncio.gather(
+        db.answer_sheets.find(query, {"_id": 0, "id": 1, "assigned_teacher_id": 1}).to_list(BULK_ASSIGN_MAX + 1),
+        teacher_cache.find(db.teachers, {"id": {"$in": [t for t in teacher_ids if t]}}, {"_id": 0, "id": 1}),
+    )
+    if body.filter is not None:
+        if len(sheets) > BULK_ASSIGN_MAX:
+            raise HTTPException(status_code=400, detail=f"The filter matches more than {BULK_ASSIGN_MAX} sheets")
+        targets = {sheet["id"]: body.teacher_id for sheet in sheets}
+    known_teachers = {teacher["id"] for teacher in teachers}
+    current = {sheet["id"]: sheet.get("assigned_teacher_id") for sheet in sheets}
+
+    results = []
+    changes: Dict[Optional[str], List[str]] = {}
+    for sheet_id, teacher_id in targets.items():
+        if teacher_id is not None and teacher_id not in known_teachers:
+            result = "unknown_teacher"
+        elif sheet_id not in current:
+            result = "not_found"
+        elif current[sheet_id] == teacher_id:
+            result = "unchanged"
+        else:
+            result = "assigned"
+            changes.setdefault(teacher_id, []).append(sheet_id)
+        results.append({"sheet_id": sheet_id, "teacher_id": teacher_id, "result": result})
+
+    if changes:
+        await db.answer_sheets.bulk_write([
+            UpdateMany({"id": {"$in": sheet_ids}}, {"$set": {"assigned_teacher_id": teacher_id}})
+            for teacher_id, sheet_ids in changes.items()
+        ], ordered=False)
+
+    assigned = sum(len(sheet_ids) for sheet_ids in changes.values())
+    unchanged = sum(1 for result in results if result["result"] == "unchanged")
+    return {"results": results, "assigned": assigned, "unchanged": unchanged,
+            "failed": len(results) - assigned - unchanged}
+
 @api_router.put("/answer-sheets/{sheet_id}/grade", response_model=AnswerSheet)
 async def grade_answer_sheet(sheet_id: str, marks_data: MarkSubmission):
-    # Get exam to validate total marks
-    sheet = await db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0})
+    sheet = await db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0, "exam_id": 1, "student_id": 1})
     if not sheet:
         raise HTTPException(status_code=404, detail="Answer sheet not found")
-    
-    exam = await db.exams.find_one({"id": sheet["exam_id"]}, {"_id": 0})
+
+    # Lookups run in dependency waves: the exam (to validate total marks) and the
+    # student (for the Excel export) need only the sheet; the write and the
+    # subject need only the exam.
+    exam, student = await asyncio.gather(
+        exam_cache.find_one(db.exams, {"id": sheet["exam_id"]}, {"_id": 0}),
+        best_effort(db.students.find_one({"id": sheet["student_id"]}, {"_id": 0}), "load student for Excel export"),
+    )
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
     
@@ -892,7 +2151,7 @@ async def grade_answer_sheet(sheet_id: str, marks_data: MarkSubmission):
                 detail=f"Total marks must be between 0 and {exam['total_marks']}"
             )
         total_marks = marks_data.total_marks
-        question_marks_list = marks_data.question_marks if marks_data.question_marks else []
+        question_marks_list = [qm.model_dump() for qm in marks_data.question_marks] if marks_data.question_marks else []
     elif marks_data.question_marks and len(marks_data.question_marks) > 0:
         # Calculate from question-wise marks
         total_marks = sum(qm.marks_obtained for qm in marks_data.question_marks)
@@ -911,24 +2170,38 @@ async def grade_answer_sheet(sheet_id: str, marks_data: MarkSubmission):
         "checked_at": datetime.now(timezone.utc).isoformat()
     }
     
-    # Add annotations if provided
+    # Replace the stored annotations if provided; encoded up front so nothing is written if that fails
+    annotation_writes = None
     if marks_data.annotations:
-        update_data["annotations"] = [ann.model_dump() if isinstance(ann, Annotation) else ann for ann in marks_data.annotations]
-    
-    result = await db.answer_sheets.update_one(
-        {"id": sheet_id},
-        {"$set": update_data}
+        annotations = [ann.model_dump() if isinstance(ann, Annotation) else ann for ann in marks_data.annotations]
+        annotation_writes = annotation_store.replace_operations(sheet_id, annotations)
+        update_data.update(annotation_store.count_annotations(annotations))
+    
+    # The pre-image says atomically whether this grading checks the sheet for
+    # the first time; with a plain $set the post-image follows from it.
+    previous, subject, _ = await asyncio.gather(
+        db.answer_sheets.find_one_and_update(
+            {"id": sheet_id},
+            {"$set": update_data},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE,
+        ),
+        best_effort(subject_cache.find_one(db.subjects, {"id": exam["subject_id"]}, {"_id": 0}),
+                    "load subject for Excel export"),
+        annotation_store.write_operations(db, annotation_writes) if annotation_writes else asyncio.sleep(0),
     )
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Answer sheet not found")
-    
-    updated = await db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0})
+    updated = {**previous, **update_data}
+    # The graded state supersedes any autosaved draft
+    await asyncio.gather(
+        db.answer_sheet_drafts.delete_one({"sheet_id": sheet_id}),
+        bump_stats(db, pending_sheets=0 if previous.get("status") == "checked" else -1),
+        best_effort(put_transcript_entry(updated, exam, subject), "update student transcript"),
+    )
 
     # Persist marks to Excel sheet
     try:
-        student = await db.students.find_one({"id": sheet["student_id"]}, {"_id": 0})
-        subject = await db.subjects.find_one({"id": exam["subject_id"]}, {"_id": 0})
-        
         if not student:
             logger.warning(f"Student not found for sheet {sheet_id}. Cannot persist to Excel.")
         elif not subject:
@@ -941,6 +2214,111 @@ async def grade_answer_sheet(sheet_id: str, marks_data: MarkSubmission):
 
     return updated
 
+# Drafts hold in-progress evaluation between autosaves: one small upsert per
+# save, no status change and no Excel write. Finalizing grades the sheet.
+async def find_sheet_checked_at(sheet_id: str) -> Optional[str]:
+    """The sheet's checked_at (None until graded); 404 if there is no such sheet"""
+    sheet = await db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0, "id": 1, "checked_at": 1})
+    if not sheet:
+        raise HTTPException(status_code=404, detail="Answer sheet not found")
+    return sheet.get("checked_at")
+
+async def find_current_draft(sheet_id: str) -> Optional[dict]:
+    """The sheet's draft, or None if there is none or it predates the last grading.
+
+    Grading deletes the draft, but an autosave still in flight can write it
+    back afterwards. Such a draft carries the checked_at the sheet had before
+    that grading (as do drafts saved before sheet_checked_at existed), so it
+    is older than the graded marks and ignored.
+    """
+    checked_at, draft = await asyncio.gather(
+        find_sheet_checked_at(sheet_id),
+        db.answer_sheet_drafts.find_one({"sheet_id": sheet_id}, {"_id": 0}),
+    )
+    if draft and draft.get("sheet_checked_at") == checked_at:
+        return draft
+    return None
+
+@api_router.put("/answer-sheets/{sheet_id}/draft", response_model=AnswerSheetDraft)
+async def save_answer_sheet_draft(sheet_id: str, draft_data: MarkSubmission):
+    checked_at = await find_sheet_checked_at(sheet_id)
+    draft = AnswerSheetDraft(sheet_id=sheet_id, sheet_checked_at=checked_at, **draft_data.model_dump(exclude_none=True))
+    await db.answer_sheet_drafts.update_one({"sheet_id": sheet_id}, {"$set": draft.model_dump()}, upsert=True)
+    return draft
+
+@api_router.get("/answer-sheets/{sheet_id}/draft", response_model=AnswerSheetDraft)
+async def get_answer_sheet_draft(sheet_id: str):
+    draft = await find_current_draft(sheet_id)
+    if not draft:
+        raise HTTPException(status_code=404, detail="No draft for this answer sheet")
+    return draft
+
+def _kept(field: str, key: str, removed: list) -> dict:
+    """The stored array without the elements whose `key` is in `removed`"""
+    stored = {"$ifNull": [f"${field}", []]}
+    if not removed:
+        return stored
+    keep = {"$not": [{"$in": [f"$$item.{key}", {"$literal": removed}]}]}
+    return {"$filter": {"input": stored, "as": "item", "cond": keep}}
+
+def draft_patch_pipeline(patch: DraftPatch, saved_at: str) -> List[dict]:
+    """Translate a delta into one pipeline update of the draft document.
+
+    A single update is applied atomically, so a reader (e.g. finalize from
+    the draft) never sees removals without the matching additions. Each
+    touched array is rebuilt as: stored elements minus removed ones, with
+    in-place changes merged in, followed by the additions. Added annotations
+    and set marks replace any element with the same key, which makes
+    replaying a patch harmless. Client values are wrapped in $literal so
+    strings starting with "$" stay data.
+    """
+    fields = {"saved_at": saved_at}
+    fields.update(
+        (name, {"$literal": value})
+        for name, value in patch.model_dump(include={"total_marks", "remarks"}, exclude_unset=True).items()
+    )
+
+    annotation_ops = patch.annotations
+    if annotation_ops.add or annotation_ops.update or annotation_ops.remove:
+        kept = _kept("annotations", "id", annotation_ops.remove + [ann.id for ann in annotation_ops.add])
+        if annotation_ops.update:
+            branches = [
+                {"case": {"$eq": ["$$ann.id", {"$literal": change.id}]},
+                 "then": {"$mergeObjects": ["$$ann", {"$literal": change.model_dump(exclude={"id"}, exclude_unset=True)}]}}
+                for change in annotation_ops.update
+            ]
+            kept = {"$map": {"input": kept, "as": "ann", "in": {"$switch": {"branches": branches, "default": "$$ann"}}}}
+        fields["annotations"] = {"$concatArrays": [kept, {"$literal": [ann.model_dump() for ann in annotation_ops.add]}]}
+
+    mark_ops = patch.question_marks
+    if mark_ops.set or mark_ops.remove:
+        kept = _kept("question_marks", "question_number", mark_ops.remove + [qm.question_number for qm in mark_ops.set])
+        fields["question_marks"] = {"$concatArrays": [kept, {"$literal": [qm.model_dump() for qm in mark_ops.set]}]}
+    return [{"$set": fields}]
+
+@api_router.patch("/answer-sheets/{sheet_id}/draft")
+async def patch_answer_sheet_draft(sheet_id: str, patch: DraftPatch):
+    """Apply annotation and question-mark deltas to the saved draft in one atomic update"""
+    saved_at = datetime.now(timezone.utc).isoformat()
+    checked_at = await find_sheet_checked_at(sheet_id)
+    result = await db.answer_sheet_drafts.update_one(
+        {"sheet_id": sheet_id, "sheet_checked_at": checked_at}, draft_patch_pipeline(patch, saved_at)
+    )
+    if result.matched_count == 0:
+        # Nothing current to apply the delta to; the client sends the full draft with PUT
+        raise HTTPException(status_code=404, detail="No draft for this answer sheet")
+    return {"sheet_id": sheet_id, "saved_at": saved_at}
+
+@api_router.post("/answer-sheets/{sheet_id}/finalize", response_model=AnswerSheet)
+async def finalize_answer_sheet(sheet_id: str, marks_data: Optional[MarkSubmission] = None):
+    """Grade the sheet with the submitted marks, or with its saved draft if none are sent"""
+    if marks_data is None or marks_data.model_dump(exclude_none=True) == {}:
+        draft = await find_current_draft(sheet_id)
+        if not draft:
+            raise HTTPException(status_code=400, detail="No marks submitted and no draft saved")
+        marks_data = MarkSubmission(**{k: v for k, v in draft.items() if k in MarkSubmission.model_fields})
+    return await grade_answer_sheet(sheet_id, marks_data)
+
 @api_router.delete("/answer-sheets/{sheet_id}")
 async def delete_answer_sheet(sheet_id: str, current_user: dict = Depends(get_current_user)):
     # Only admin can delete answer sheets
@@ -951,12 +2329,16 @@ async def delete_answer_sheet(sheet_id: str, current_user: dict = Depends(get_cu
         raise HTTPException(status_code=404, detail="Answer sheet not found")
 
     # Try deleting the file from GridFS; ignore if it does not exist
-    try:
-        await fs_bucket.delete(ObjectId(sheet["pdf_filename"]))
-    except Exception:
-        pass
+    await delete_gridfs_file(sheet["pdf_filename"])
 
-    await db.answer_sheets.delete_one({"id": sheet_id})
+    result, _, _ = await asyncio.gather(
+        db.answer_sheets.delete_one({"id": sheet_id}),
+        db.answer_sheet_drafts.delete_one({"sheet_id": sheet_id}),
+        annotation_store.delete_sheet_annotations(db, sheet_id),
+    )
+    if result.deleted_count:
+        await bump_stats(db, answer_sheets=-1, pending_sheets=-1 if sheet.get("status") != "checked" else 0)
+    await best_effort(transcripts.remove_entry(db, sheet["student_id"], sheet_id), "remove sheet from student transcript")
     return {"message": "Answer sheet deleted successfully"}
 
 @api_router.put("/answer-sheets/{sheet_id}/reupload")
@@ -964,7 +2346,12 @@ async def reupload_answer_sheet(sheet_id: str, file: UploadFile = File(...), cur
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
-    sheet = await db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0})
+    is_teacher = current_user["role"] == "teacher"
+    # The teacher's access does not depend on the sheet; on a cache miss it loads alongside
+    sheet, access = await asyncio.gather(
+        db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0}),
+        get_teacher_access(current_user, db) if is_teacher else asyncio.sleep(0),
+    )
     if not sheet:
         raise HTTPException(status_code=404, detail="Answer sheet not found")
 
@@ -973,14 +2360,13 @@ async def reupload_answer_sheet(sheet_id: str, file: UploadFile = File(...), cur
         raise HTTPException(status_code=403, detail="Reupload blocked: paper is already checked")
 
     # Teacher must be assigned to the subject of the exam
-    if current_user["role"] == "teacher":
-        exam = await db.exams.find_one({"id": sheet["exam_id"]}, {"_id": 0})
+    if is_teacher:
+        exam = await exam_cache.find_one(db.exams, {"id": sheet["exam_id"]}, {"_id": 0, "subject_id": 1})
         if not exam:
             raise HTTPException(status_code=404, detail="Exam not found")
-        teacher = await db.teachers.find_one({"email": current_user["email"]}, {"_id": 0})
-        if not teacher:
+        if not access:
             raise HTTPException(status_code=404, detail="Teacher profile not found")
-        if exam["subject_id"] not in teacher.get("subject_ids", []):
+        if not access.may_access_exam(exam):
             raise HTTPException(status_code=403, detail="Not allowed for non-assigned subjects")
 
     # Upload new PDF to GridFS
@@ -994,34 +2380,283 @@ async def reupload_answer_sheet(sheet_id: str, file: UploadFile = File(...), cur
     }
     new_gridfs_id = await fs_bucket.upload_from_stream(file_id, file.file, metadata=metadata)
 
-    # Delete old file if present
-    try:
-        await fs_bucket.delete(ObjectId(sheet["pdf_filename"]))
-    except Exception:
-        pass
-
-    # Update the sheet with new file id
-    await db.answer_sheets.update_one({"id": sheet_id}, {"$set": {"pdf_filename": str(new_gridfs_id)}})
-    updated = await db.answer_sheets.find_one({"id": sheet_id}, {"_id": 0})
+    # Point the sheet at the new file while the old one is deleted
+    _, updated = await asyncio.gather(
+        delete_gridfs_file(sheet["pdf_filename"]),
+        db.answer_sheets.find_one_and_update(
+            {"id": sheet_id},
+            {"$set": {"pdf_filename": str(new_gridfs_id)}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        ),
+    )
+    if not updated:
+        raise HTTPException(status_code=404, detail="Answer sheet not found")
     return updated
 
+# Teacher work queue
+# Served in this order: everything pending (oldest upload first), then everything checked
+QUEUE_STATUSES = ("pending", "checked")
+QUEUE_SHEET_FIELDS = {
+    "_id": 1, "id": 1, "exam_id": 1, "student_id": 1, "status": 1, "marks_obtained": 1,
+    "question_marks": 1, "annotation_count": 1, "annotation_counts": 1, "remarks": 1, "checked_at": 1,
+    "created_at": 1,
+}
+
+def parse_queue_cursor(after: Optional[str], statuses: tuple) -> tuple:
+    """(position in `statuses`, _id to continue after) for a queue cursor of the form "<status>:<_id>" """
+    if not after:
+        return 0, None
+    status, _, last_id = after.partition(":")
+    if status not in statuses:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return statuses.index(status), parse_cursor(last_id)
+
+async def fetch_queue_page(teacher_id: str, statuses: tuple, response: Response,
+                           after: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+    """One page of a teacher's sheets, keyset-paginated on (status, _id) over the teacher_queue index.
+
+    Each status is read as its own index range, continuing into the next one
+    when a page runs past the end of the current one.
+    """
+    limit = min(max(limit or PAGE_SIZE_DEFAULT, 1), PAGE_SIZE_MAX)
+    position, last_id = parse_queue_cursor(after, statuses)
+    docs = []
+    for status in statuses[position:]:
+        query = {"assigned_teacher_id": teacher_id, "status": status}
+        if last_id:
+            query["_id"] = {"$gt": last_id}
+            last_id = None
+        # One extra document tells whether another page exists
+        wanted = limit + 1 - len(docs)
+        docs += await db.answer_sheets.find(query, QUEUE_SHEET_FIELDS).sort("_id", 1).limit(wanted).to_list(wanted)
+        if len(docs) > limit:
+            docs = docs[:limit]
+            response.headers["X-Next-Cursor"] = f"{docs[-1]['status']}:{docs[-1]['_id']}"
+            break
+    for doc in docs:
+        doc.pop("_id")
+    return docs
+
+async def count_queue(teacher_id: str) -> Dict[str, Dict[str, int]]:
+    """exam id -> status -> number of the teacher's sheets"""
+    groups = await db.answer_sheets.aggregate([
+        {"$match": {"assigned_teacher_id": teacher_id}},
+        {"$group": {"_id": {"exam_id": "$exam_id", "status": "$status"}, "n": {"$sum": 1}}},
+    ]).to_list(None)
+    counts: Dict[str, Dict[str, int]] = {}
+    for group in groups:
+        counts.setdefault(group["_id"]["exam_id"], {})[group["_id"]["status"]] = group["n"]
+    return counts
+
+@api_router.get("/teachers/me/queue", response_model=TeacherQueue)
+async def get_teacher_queue(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    current_user: dict = Depends(require_role("teacher")),
+):
+    """The logged-in teacher's assigned sheets, pending first, with per-exam counts.
+
+    Counts and exams cover the whole queue on every page; `sheets` is the
+    page, continued with the X-Next-Cursor header as `after`.
+    """
+    if status is not None and status not in QUEUE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {status}")
+    access = await get_teacher_access(current_user, db)
+    if not access:
+        raise HTTPException(status_code=404, detail="Teacher profile not found")
+
+    statuses = (status,) if status else QUEUE_STATUSES
+    sheets, counts = await asyncio.gather(
+        fetch_queue_page(access.teacher_id, statuses, response, after, limit),
+        count_queue(access.teacher_id),
+    )
+    exams, students = await asyncio.gather(
+        exam_cache.find(db.exams, {"id": {"$in": list(counts)}}, {"_id": 0}),
+        BatchLoader(db).load_many("students", list({sheet["student_id"] for sheet in sheets})),
+    )
+    subjects = await subject_cache.find(
+        db.subjects, {"id": {"$in": list({exam["subject_id"] for exam in exams})}}, {"_id": 0}
+    )
+    exams_by_id = {exam["id"]: exam for exam in exams}
+    subject_names = {subject["id"]: subject.get("name") for subject in subjects}
+    students_by_id = {student["id"]: student for student in students if student}
+
+    for sheet in sheets:
+        exam = exams_by_id.get(sheet["exam_id"], {})
+        student = students_by_id.get(sheet["student_id"], {})
+        sheet.update(
+            student_name=student.get("name"),
+            roll_number=student.get("roll_number"),
+            exam_type=exam.get("exam_type"),
+            total_marks=exam.get("total_marks"),
+            subject_id=exam.get("subject_id"),
+            subject_name=subject_names.get(exam.get("subject_id")),
+        )
+    queue_exams = []
+    for exam_id, by_status in counts.items():
+        exam = exams_by_id.get(exam_id, {})
+        queue_exams.append({
+            "exam_id": exam_id,
+            "exam_type": exam.get("exam_type"),
+            "total_marks": exam.get("total_marks"),
+            "class_name": exam.get("class_name"),
+            "questions": exam.get("questions", []),
+            "subject_id": exam.get("subject_id"),
+            "subject_name": subject_names.get(exam.get("subject_id")),
+            "pending": by_status.get("pending", 0),
+            "checked": by_status.get("checked", 0),
+        })
+    queue_exams.sort(key=lambda exam: (-exam["pending"], exam["subject_name"] or "", exam["exam_type"] or ""))
+
+    queue = {
+        "sheets": sheets,
+        "exams": queue_exams,
+        "pending": sum(exam["pending"] for exam in queue_exams),
+        "checked": sum(exam["checked"] for exam in queue_exams),
+        "subject_ids": sorted(access.subject_ids),
+    }
+    return conditional_response(request, response, queue, TeacherQueue, None, response.headers.get("X-Next-Cursor"))
+
+# Student results
+async def build_student_transcript(query: dict) -> Optional[dict]:
+    """Build and store a transcript from the answer sheets; None when there is no such student"""
+    student = await db.students.find_one(query, {"_id": 0})
+    if not student:
+        return None
+    sheets = await db.answer_sheets.find(
+        {"student_id": student["id"]}, {"_id": 0, "question_marks": 0}
+    ).to_list(None)
+    exams = await exam_cache.find(db.exams, {"id": {"$in": list({sheet["exam_id"] for sheet in sheets})}}, {"_id": 0})
+    subjects = await subject_cache.find(
+        db.subjects, {"id": {"$in": list({exam["subject_id"] for exam in exams})}}, {"_id": 0}
+    )
+    transcript = transcripts.build(student, sheets, exams, subjects)
+    # Two first loads racing on the unique index is harmless; the first copy stored wins
+    if await best_effort(transcripts.save(db, transcript), "store student transcript"):
+        caught_up = await best_effort(catch_up_transcript(transcript, exams, subjects), "catch up student transcript")
+        if caught_up:
+            return caught_up
+    return transcript
+
+async def catch_up_transcript(transcript: dict, exams: List[dict], subjects: List[dict]) -> Optional[dict]:
+    """Apply sheet writes that landed between reading the sheets and storing the transcript.
+
+    Their own transcript updates found no document and did nothing; writes
+    after the insert update it themselves. Returns the stored transcript if
+    anything changed, otherwise None.
+    """
+    student_id = transcript["student_id"]
+    sheets = await db.answer_sheets.find({"student_id": student_id}, {"_id": 0, "question_marks": 0}).to_list(None)
+    built = {entry["sheet_id"]: entry for entry in transcript["results"]}
+    rebuilt = transcripts.build(transcript["student"], sheets, exams, subjects)
+    current = {entry["sheet_id"]: entry for entry in rebuilt["results"]}
+    # Sheets whose exam was not loaded differ here too; put_transcript_entry looks the exam up
+    changed = [sheet for sheet in sheets if current[sheet["id"]] != built.get(sheet["id"])]
+    removed = built.keys() - current.keys()
+    if not changed and not removed:
+        return None
+    await asyncio.gather(
+        *(put_transcript_entry(sheet) for sheet in changed),
+        *(transcripts.remove_entry(db, student_id, sheet_id) for sheet_id in removed),
+    )
+    return await db[transcripts.COLLECTION].find_one({"student_id": student_id}, {"_id": 0})
+
+@api_router.get("/me/results", response_model=StudentResults)
+async def get_my_results(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(require_role("student")),
+):
+    """The logged-in student's profile and results, from their transcript document"""
+    if "student_id" in current_user:
+        student_query = {"id": current_user["student_id"]}
+        query = {"student_id": current_user["student_id"]}
+    else:
+        student_query = {"email": current_user["email"]}
+        query = {"student.email": current_user["email"]}
+    transcript = await db[transcripts.COLLECTION].find_one(query, {"_id": 0})
+    if not transcript:
+        transcript = await build_student_transcript(student_query)
+        if not transcript:
+            raise HTTPException(status_code=404, detail="Student profile not found")
+    return conditional_response(request, response, transcript, StudentResults, None)
+
 # Dashboard stats
+# Counters live in one small document that handlers keep current with $inc;
+# a periodic reconciliation pass recounts everything to correct any drift.
+STATS_DOC_ID = "dashboard"
+STATS_RECONCILE_SECONDS = float(os.environ.get("STATS_RECONCILE_SECONDS", "300"))
+
+async def bump_stats(database, **deltas):
+    """Apply counter deltas; a missing document is rebuilt by the next read"""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    try:
+        await database.stats.update_one({"_id": STATS_DOC_ID}, {"$inc": deltas})
+    except Exception as e:
+        logger.error(f"Failed to update dashboard counters: {e}")
+
+async def count_dashboard_stats(database) -> dict:
+    """Count everything from scratch, concurrently; answer sheets in one $facet pass"""
+    sheet_counts = database.answer_sheets.aggregate([
+        {"$facet": {
+            "answer_sheets": [{"$count": "n"}],
+            "pending_sheets": [{"$match": {"status": "pending"}}, {"$count": "n"}],
+        }}
+    ]).to_list(1)
+    students, teachers, subjects, exams, facet = await asyncio.gather(
+        database.students.count_documents({}),
+        database.teachers.count_documents({}),
+        database.subjects.count_documents({}),
+        database.exams.count_documents({}),
+        sheet_counts,
+    )
+    facet = facet[0] if facet else {}
+    return {
+        "students": students,
+        "teachers": teachers,
+        "subjects": subjects,
+        "exams": exams,
+        "answer_sheets": facet["answer_sheets"][0]["n"] if facet.get("answer_sheets") else 0,
+        "pending_sheets": facet["pending_sheets"][0]["n"] if facet.get("pending_sheets") else 0,
+    }
+
+async def reconcile_dashboard_stats(database) -> dict:
+    stats = await count_dashboard_stats(database)
+    await database.stats.update_one(
+        {"_id": STATS_DOC_ID},
+        {"$set": {**stats, "reconciled_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    return stats
+
+async def reconcile_stats_forever():
+    while True:
+        try:
+            database = get_db()
+            if database is not None:
+                await reconcile_dashboard_stats(database)
+        except Exception as e:
+            logger.error(f"Failed to reconcile dashboard counters: {e}")
+        await asyncio.sleep(STATS_RECONCILE_SECONDS)
+
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats():
-    students_count = await db.students.count_documents({})
-    teachers_count = await db.teachers.count_documents({})
-    subjects_count = await db.subjects.count_documents({})
-    exams_count = await db.exams.count_documents({})
-    answer_sheets_count = await db.answer_sheets.count_documents({})
-    pending_sheets = await db.answer_sheets.count_documents({"status": "pending"})
-    
+    stats = await db.stats.find_one({"_id": STATS_DOC_ID}, {"_id": 0, "reconciled_at": 0})
+    if not stats:
+        stats = await reconcile_dashboard_stats(db)
     return {
-        "students": students_count,
-        "teachers": teachers_count,
-        "subjects": subjects_count,
-        "exams": exams_count,
-        "answer_sheets": answer_sheets_count,
-        "pending_sheets": pending_sheets
+        "students": stats.get("students", 0),
+        "teachers": stats.get("teachers", 0),
+        "subjects": stats.get("subjects", 0),
+        "exams": stats.get("exams", 0),
+        "answer_sheets": stats.get("answer_sheets", 0),
+        "pending_sheets": stats.get("pending_sheets", 0),
     }
 
 # Excel Export
@@ -1033,22 +2668,21 @@ async def export_marksheet(exam_id: str):
     from fastapi.responses import StreamingResponse
     
     # Fetch exam details
-    exam = await db.exams.find_one({"id": exam_id}, {"_id": 0})
+    exam = await exam_cache.find_one(db.exams, {"id": exam_id}, {"_id": 0})
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
     
     # Fetch subject
-    subject = await db.subjects.find_one({"id": exam["subject_id"]}, {"_id": 0})
+    subject = await subject_cache.find_one(db.subjects, {"id": exam["subject_id"]}, {"_id": 0})
     subject_name = subject["name"] if subject else "Unknown"
     
     # Fetch all answer sheets for this exam
-    answer_sheets = await db.answer_sheets.find({"exam_id": exam_id}, {"_id": 0}).to_list(1000)
+    answer_sheets = await db.answer_sheets.find({"exam_id": exam_id}, {"_id": 0}).to_list(None)
     
-    # Fetch all students
-    students_dict = {}
-    students = await db.students.find({}, {"_id": 0}).to_list(1000)
-    for student in students:
-        students_dict[student["id"]] = student
+    # Fetch the students who wrote it, in one query
+    student_ids = {sheet["student_id"] for sheet in answer_sheets}
+    students = await BatchLoader(db).load_many("students", student_ids)
+    students_dict = {student["id"]: student for student in students if student}
     
     # Create workbook
     wb = Workbook()
@@ -1175,22 +2809,29 @@ async def export_subject_results(class_name: Optional[str] = None):
     subj_query = {}
     if class_name:
         subj_query["class_name"] = class_name
-    subjects = await db.subjects.find(subj_query, {"_id": 0}).to_list(1000)
+    subjects = await subject_cache.find(db.subjects, subj_query, {"_id": 0})
     if not subjects:
         raise HTTPException(status_code=404, detail="No subjects found")
 
     # Preload teachers and students
-    teachers = await db.teachers.find({}, {"_id": 0}).to_list(1000)
+    teachers = await teacher_cache.find(db.teachers, {}, {"_id": 0})
     teachers_by_id = {t["id"]: t for t in teachers}
-    students = await db.students.find({}, {"_id": 0}).to_list(1000)
-    students_by_id = {s["id"]: s for s in students}
 
     # Preload exams by subject id
-    exams = await db.exams.find({}, {"_id": 0}).to_list(1000)
+    exams = await exam_cache.find(db.exams, {"subject_id": {"$in": [subject["id"] for subject in subjects]}}, {"_id": 0})
     exams_by_subject = {}
     for ex in exams:
         exams_by_subject.setdefault(ex["subject_id"], []).append(ex)
 
+    # Answer sheets of all those exams in one query, then only the students who wrote them
+    sheets_by_exam = {}
+    sheets = db.answer_sheets.find({"exam_id": {"$in": [ex["id"] for ex in exams]}}, {"_id": 0})
+    async for sheet in sheets:
+        sheets_by_exam.setdefault(sheet["exam_id"], []).append(sheet)
+    student_ids = {sheet["student_id"] for exam_sheets in sheets_by_exam.values() for sheet in exam_sheets}
+    students = await BatchLoader(db).load_many("students", student_ids)
+    students_by_id = {s["id"]: s for s in students if s}
+
     # Workbook setup
     wb = Workbook()
     # Remove the default sheet; we'll add per-subject sheets
@@ -1225,8 +2866,7 @@ async def export_subject_results(class_name: Optional[str] = None):
         subject_exams = exams_by_subject.get(subject["id"], [])
         # For each exam under this subject, list all answer sheets
         for exam in subject_exams:
-            sheets = await db.answer_sheets.find({"exam_id": exam["id"]}, {"_id": 0}).to_list(10000)
-            for sheet in sheets:
+            for sheet in sheets_by_exam.get(exam["id"], []):
                 teacher = teachers_by_id.get(sheet.get("assigned_teacher_id"))
                 student = students_by_id.get(sheet.get("student_id"))
                 ws.cell(row=row_num, column=1, value=(teacher.get("name") if teacher else "Not Assigned"))
@@ -1279,6 +2919,24 @@ async def export_subject_results(class_name: Optional[str] = None):
         }
     )
 
+# Metrics
+@api_router.get("/admin/metrics")
+async def get_metrics(current_user: dict = Depends(require_role("admin"))):
+    return {
+        "password_service": password_service.stats(),
+        "login_admission": login_admission.stats(),
+        "principal_cache": principal_cache.stats(),
+        "teacher_access_cache": teacher_access_cache.stats(),
+        "progress_cache": progress_cache.stats(),
+        "reference_caches": {name: cache.stats() for name, cache in REFERENCE_CACHES.items()},
+        "auth_mode": AUTH_MODE,
+        "revocations": revocations.stats(),
+    }
+
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user: dict = Depends(require_role("admin")), database = Depends(get_database)):
+    return await db_indexes.index_report(database)
+
 app = FastAPI()
 
 cors_origins = os.environ.get('CORS_ORIGINS', '*')
@@ -1294,7 +2952,7 @@ app.add_middleware(
     allow_origins=allow_origins,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition", "Content-Type"],
+    expose_headers=["Content-Disposition", "Content-Type", "X-Next-Cursor", "ETag"],
 )
 
 @app.get("/")
@@ -1308,9 +2966,34 @@ async def root():
 
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def start_background_tasks():
+    database = get_db()
+    if database is None:
+        return
+    if os.environ.get("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true":
+        try:
+            result = await db_indexes.ensure_indexes(database)
+            if result["created"]:
+                logger.info(f"✅ Created indexes: {', '.join(result['created'])}")
+        except Exception as e:
+            logger.error(f"Failed to ensure indexes: {e}")
+    try:
+        await warm_reference_caches(database)
+        logger.info("✅ Reference caches warmed")
+    except Exception as e:
+        logger.error(f"Failed to warm reference caches: {e}")
+    app.state.background_tasks = [asyncio.create_task(reconcile_stats_forever())]
+    if AUTH_MODE == "claims":
+        app.state.background_tasks.append(asyncio.create_task(refresh_revocations_forever()))
+        logger.info("✅ Claims auth mode: revocation refresher started")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     if client:
         client.close()
+    password_service.shutdown()
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
 
 __all__ = ['app', 'api_router', 'client', 'db', 'fs_bucket']
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests.
+
+Runs explain() on the queries the request handlers in server.py send to
+MongoDB (filter, sort and limit as sent) and fails if any of them falls back
+to a collection scan, sorts in memory or examines far more documents than it
+returns. Uses a throwaway database on the mongod at
+PLAN_TEST_MONGO_URL (default mongodb://localhost:27017), after applying the
+index registry from db_indexes.py. The docker-compose mongo service or a
+throwaway `mongod --storageEngine inMemory` both work; without a reachable
+mongod the tests are skipped.
+
+    python test_query_plans.py       # or: pytest test_query_plans.py
+"""
+
+import asyncio
+import os
+import uuid
+
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import db_indexes
+
+MONGO_URL = os.environ.get("PLAN_TEST_MONGO_URL", "mongodb://localhost:27017")
+
+# A query may examine at most this many documents per document returned
+MAX_EXAMINED_RATIO = 2
+
+# Seeded ids referenced by the queries below
+STUDENT_ID = "student-7"
+TEACHER_ID = "teacher-1"
+SUBJECT_ID = "subject-2"
+EXAM_ID = "exam-3"
+
+# fetch_page asks for one document more than the page size (PAGE_SIZE_DEFAULT is 500)
+PAGE_LIMIT = 501
+
+
+def page(query: dict, after: bool = False) -> dict:
+    """The cursor fetch_page sends for a list endpoint page; `after` for the pages after the first"""
+    if after:
+        query = {**query, "_id": {"$gt": ObjectId("0" * 24)}}
+    return {"filter": query, "sort": {"_id": 1}, "limit": PAGE_LIMIT}
+
+
+# name -> (collection, explain command body, handler(s) in server.py)
+HOT_QUERIES = {
+    "users_by_email": ("users", {"filter": {"email": "student7@example.com"}}, "login, get_current_user"),
+    "refresh_token_by_hash": ("refresh_tokens", {"filter": {"token_hash": "hash-1"}}, "refresh_access_token"),
+    "student_by_id": ("students", {"filter": {"id": STUDENT_ID}}, "get_student, grade_answer_sheet"),
+    "students_by_ids": (
+        "students", {"filter": {"id": {"$in": [STUDENT_ID, "student-8"]}}}, "BatchLoader (exports)",
+    ),
+    "students_by_class": ("students", page({"class_name": "BE"}), "get_students"),
+    "students_by_class_semester": ("students", page({"class_name": "BE", "semester": "7"}, after=True), "get_students"),
+    "students_by_semester": ("students", page({"semester": "7"}), "get_students"),
+    "teacher_by_id": ("teachers", {"filter": {"id": TEACHER_ID}}, "get_teacher"),
+    "teacher_by_email": ("teachers", {"filter": {"email": "teacher1@example.com"}}, "get_teacher_access"),
+    "subject_by_id": ("subjects", {"filter": {"id": SUBJECT_ID}}, "get_subject, grade_answer_sheet"),
+    "subjects_by_class": ("subjects", {"filter": {"class_name": "BE"}}, "export_subject_results"),
+    "subjects_page_by_class": ("subjects", page({"class_name": "BE"}), "get_subjects (uncached)"),
+    "exam_by_id": ("exams", {"filter": {"id": EXAM_ID}}, "get_exam, grade_answer_sheet"),
+    "exams_for_teacher": (
+        "exams", page({"subject_id": {"$in": [SUBJECT_ID, "subject-3"]}}), "get_exams (teacher scoping, uncached)",
+    ),
+    "sheet_by_id": ("answer_sheets", {"filter": {"id": "sheet-42"}}, "get_answer_sheet, grade_answer_sheet"),
+    "sheets_by_teacher": ("answer_sheets", {"filter": {"assigned_teacher_id": TEACHER_ID}}, "count_queue"),
+    "sheets_page_by_teacher": (
+        "answer_sheets", page({"assigned_teacher_id": TEACHER_ID}, after=True), "get_answer_sheets",
+    ),
+    "sheets_page_by_teacher_status": (
+        "answer_sheets", page({"assigned_teacher_id": TEACHER_ID, "status": "pending"}), "get_answer_sheets",
+    ),
+    "teacher_queue_page": (
+        "answer_sheets",
+        {"filter": {"assigned_teacher_id": TEACHER_ID, "status": "checked", "_id": {"$gt": ObjectId("0" * 24)}},
+         "sort": {"_id": 1}, "limit": 20},
+        "get_teacher_queue",
+    ),
+    "sheets_by_student": ("answer_sheets", {"filter": {"student_id": STUDENT_ID}}, "build_student_transcript"),
+    "sheets_page_by_student": ("answer_sheets", page({"student_id": STUDENT_ID}), "get_answer_sheets"),
+    "sheets_page_pending": ("answer_sheets", page({"status": "pending"}, after=True), "get_answer_sheets"),
+    "sheets_by_exam": (
+        "answer_sheets", {"filter": {"exam_id": EXAM_ID}}, "export_marksheet",
+    ),
+    "sheets_by_exams": (
+        "answer_sheets", {"filter": {"exam_id": {"$in": [EXAM_ID, "exam-4"]}}},
+        "export_subject_results, aggregate_progress",
+    ),
+    "annotations_by_sheet_page": (
+        "annotations", {"filter": {"sheet_id": "sheet-40", "page": 2}}, "get_answer_sheet_annotations (per page)",
+    ),
+    "annotations_by_sheet": (
+        "annotations", {"filter": {"sheet_id": "sheet-40"}, "sort": {"page": 1}}, "get_answer_sheet_annotations",
+    ),
+    "draft_by_sheet": (
+        "answer_sheet_drafts", {"filter": {"sheet_id": "sheet-40"}},
+        "get_answer_sheet_draft, finalize_answer_sheet",
+    ),
+    "results_by_student": ("student_results", {"filter": {"student_id": STUDENT_ID}}, "get_my_results, transcripts"),
+    "results_by_student_email": (
+        "student_results", {"filter": {"student.email": "student7@example.com"}}, "get_my_results",
+    ),
+    "checked_sheet_for_student": (
+        "answer_sheets",
+        {"filter": {"exam_id": EXAM_ID, "student_id": STUDENT_ID, "status": "checked"}},
+        "upload_answer_sheet",
+    ),
+}
+
+# count_documents filters; explained through the count command
+HOT_COUNTS = {
+    "count_pending_sheets": ("answer_sheets", {"status": "pending"}, "get_dashboard_stats"),
+}
+
+
+async def seed(db):
+    await db_indexes.ensure_indexes(db)
+    await db.students.insert_many([
+        {"id": f"student-{i}", "email": f"student{i}@example.com", "name": f"Student {i}",
+         "roll_number": str(i), "class_name": ["SY", "TY", "BE"][i % 3], "semester": str(3 + i % 5)}
+        for i in range(60)
+    ])
+    await db.users.insert_many([{"email": f"student{i}@example.com", "role": "student"} for i in range(60)])
+    await db.teachers.insert_many([
+        {"id": f"teacher-{i}", "email": f"teacher{i}@example.com", "subject_ids": [f"subject-{i}"]}
+        for i in range(6)
+    ])
+    await db.subjects.insert_many([
+        {"id": f"subject-{i}", "code": f"S{i}", "class_name": ["SY", "TY", "BE"][i % 3]} for i in range(6)
+    ])
+    await db.exams.insert_many([
+        {"id": f"exam-{i}", "subject_id": f"subject-{i % 6}", "exam_type": "CA-1", "total_marks": 20}
+        for i in range(12)
+    ])
+    await db.answer_sheets.insert_many([
+        {"id": f"sheet-{i}", "exam_id": f"exam-{i % 12}", "student_id": f"student-{i % 60}",
+         "assigned_teacher_id": f"teacher-{i % 6}", "status": "checked" if i % 4 else "pending",
+         "created_at": f"2026-01-01T00:00:{i % 60:02d}"}
+        for i in range(600)
+    ])
+    await db.annotations.insert_many([
+        {"sheet_id": f"sheet-{i}", "page": page, "annotations": []} for i in range(0, 600, 4) for page in (1, 2, 3)
+    ])
+    await db.answer_sheet_drafts.insert_many([
+        {"sheet_id": f"sheet-{i}", "question_marks": [], "annotations": []} for i in range(0, 600, 4)
+    ])
+    await db.student_results.insert_many([
+        {"student_id": f"student-{i}", "student": {"id": f"student-{i}", "email": f"student{i}@example.com"},
+         "results": []}
+        for i in range(60)
+    ])
+    await db.refresh_tokens.insert_many([
+        {"token_hash": f"hash-{i}", "email": f"student{i}@example.com", "family_id": f"family-{i}"}
+        for i in range(20)
+    ])
+
+
+def plan_stages(plan: dict):
+    """Yield every stage name in a winning plan tree"""
+    yield plan.get("stage")
+    for child in plan.get("inputStages", []) + [plan.get("inputStage") or {}]:
+        if child:
+            yield from plan_stages(child)
+    # Slot-based engine wraps the classic plan in queryPlan
+    if "queryPlan" in plan:
+        yield from plan_stages(plan["queryPlan"])
+
+
+async def explain_all():
+    client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        client.close()
+        return None, f"No mongod reachable at {MONGO_URL}: {e}"
+
+    db = client[f"gradeflow_plan_test_{uuid.uuid4().hex[:8]}"]
+    results = {}
+    try:
+        await seed(db)
+        commands = {
+            name: {"find": collection, **body} for name, (collection, body, _) in HOT_QUERIES.items()
+        }
+        commands.update({
+            name: {"count": collection, "query": query} for name, (collection, query, _) in HOT_COUNTS.items()
+        })
+        for name, command in commands.items():
+            explained = await db.command({"explain": command, "verbosity": "executionStats"})
+            stats = explained["executionStats"]
+            results[name] = {
+                "stages": [stage for stage in plan_stages(explained["queryPlanner"]["winningPlan"]) if stage],
+                "examined": stats["totalDocsExamined"],
+                "returned": stats["nReturned"],
+            }
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+    return results, None
+
+
+@pytest.fixture(scope="module")
+def plans():
+    results, error = asyncio.run(explain_all())
+    if error:
+        pytest.skip(error)
+    return results
+
+
+def check_plan(name: str, plan: dict):
+    assert "COLLSCAN" not in plan["stages"], f"{name} falls back to a collection scan: {plan['stages']}"
+    # Sorted queries must read their order off an index rather than sort every match in memory
+    assert "SORT" not in plan["stages"], f"{name} sorts in memory: {plan['stages']}"
+    # count plans return no documents, so they must be answered from the index alone
+    allowed = max(plan["returned"], 1) * MAX_EXAMINED_RATIO
+    assert plan["examined"] <= allowed, (
+        f"{name} examined {plan['examined']} documents to return {plan['returned']}"
+    )
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES) + list(HOT_COUNTS))
+def test_query_uses_index(plans, name):
+    check_plan(name, plans[name])
+
+
+if __name__ == "__main__":
+    results, error = asyncio.run(explain_all())
+    if error:
+        print(f"⚠️  {error}")
+        raise SystemExit(0)
+
+    print("=" * 70)
+    print("QUERY PLAN CHECK")
+    print("=" * 70)
+    failures = 0
+    handlers = {name: entry[2] for name, entry in {**HOT_QUERIES, **HOT_COUNTS}.items()}
+    for name, plan in results.items():
+        try:
+            check_plan(name, plan)
+            print(f"✅ {name:30} {'>'.join(plan['stages']):40} {plan['examined']}/{plan['returned']}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {name:30} ({handlers[name]}): {e}")
+    print(f"\n{len(results) - failures}/{len(results)} queries use their indexes")
+    raise SystemExit(1 if failures else 0)
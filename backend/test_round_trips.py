@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Mongo round-trip budget tests for mutation endpoints.
+
+Calls the handlers in server.py directly against a throwaway database on the
+mongod at PLAN_TEST_MONGO_URL (default mongodb://localhost:27017) and checks
+two numbers per call:
+
+  commands  every command sent, counted with pymongo command monitoring; goes
+            up when a handler e.g. re-reads a document it just wrote
+  depth     the critical path: calls issued together (asyncio.gather) share a
+            level, a call issued after another finished sits one deeper. Fully
+            serial code has depth == commands; on a remote cluster latency
+            scales with depth.
+
+GridFS traffic for PDF uploads is not counted. Skipped without a reachable
+mongod.
+
+    python test_round_trips.py       # or: pytest test_round_trips.py
+"""
+
+import asyncio
+import io
+import os
+import uuid
+
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import monitoring
+from starlette.datastructures import UploadFile
+
+import server
+
+MONGO_URL = os.environ.get("PLAN_TEST_MONGO_URL", "mongodb://localhost:27017")
+
+# name -> (max Mongo commands, max critical-path depth) per handler call
+ROUND_TRIP_BUDGETS = {
+    # update > the copy in the student's results transcript (best-effort, after the update)
+    "update_student": (2, 2),
+    "update_teacher": (1, 1),
+    # update > the names copied into results transcripts
+    "update_subject": (2, 2),
+    "update_exam": (2, 2),
+    "assign_answer_sheet": (1, 1),
+    # current assignments (teachers cached) > one bulk_write for every change
+    "bulk_assign_answer_sheets": (2, 2),
+    # sheet > student > update > stats counter + draft cleanup + transcript entry
+    # (exam and subject come from the reference cache)
+    "grade_answer_sheet": (6, 4),
+    # sheet's checked_at > one upsert; no status change, no Excel write
+    "save_answer_sheet_draft": (2, 2),
+    # sheet's checked_at > removals, in-place changes and additions in one update command
+    "patch_answer_sheet_draft": (2, 2),
+    # draft + sheet's checked_at > grade, plus the annotation pages (replace + delete) next to the update
+    "finalize_answer_sheet": (10, 5),
+    # duplicate check > insert + stats counter > transcript entry (exam and teacher cached)
+    "upload_answer_sheet": (4, 3),
+    # sheet > update (GridFS upload/delete not counted)
+    "reupload_answer_sheet": (2, 2),
+    # sheet > update (teacher and exam cached)
+    "reupload_answer_sheet_teacher": (2, 2),
+}
+
+# Collection methods the handlers await directly
+TRACED_METHODS = {
+    "find_one", "find_one_and_update", "find_one_and_delete",
+    "insert_one", "update_one", "update_many", "replace_one", "delete_one", "delete_many", "bulk_write",
+    "count_documents",
+}
+
+GRIDFS_PREFIX = "answer_sheets."
+ADMIN = {"email": "admin@example.com", "role": "admin"}
+TEACHER = {"email": "rt-teacher@example.com", "role": "teacher"}
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if isinstance(target, str) and target.startswith(GRIDFS_PREFIX):
+            return
+        if event.command_name in ("endSessions", "ping"):
+            return
+        self.commands.append(f"{event.command_name} {target}")
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class DepthTracer:
+    """Critical-path depth of the Mongo calls made through TracedDatabase"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.finished_level = 0
+        self.depth = 0
+
+    def wrap(self, method):
+        async def traced(*args, **kwargs):
+            level = self.finished_level + 1
+            self.depth = max(self.depth, level)
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                self.finished_level = max(self.finished_level, level)
+        return traced
+
+
+class TracedCollection:
+    def __init__(self, collection, tracer):
+        self._collection = collection
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        return self._tracer.wrap(attr) if name in TRACED_METHODS else attr
+
+
+class TracedDatabase:
+    def __init__(self, database, tracer):
+        self._database = database
+        self._tracer = tracer
+
+    def __getitem__(self, name):
+        return TracedCollection(self._database[name], self._tracer)
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+async def seed(db):
+    await db.students.insert_one({"id": "student-1", "email": "rt-student@example.com", "name": "RT Student",
+                                  "roll_number": "RT-1", "class_name": "BE"})
+    await db.teachers.insert_one({"id": "teacher-1", "email": "rt-teacher@example.com", "name": "RT Teacher",
+                                  "subject_ids": ["subject-1"]})
+    await db.subjects.insert_one({"id": "subject-1", "name": "Round Trips", "code": "RT-SUBJ", "class_name": "BE"})
+    await db.exams.insert_one({"id": "exam-1", "subject_id": "subject-1", "exam_type": "CA-1", "date": "2026-01-01",
+                               "total_marks": 20, "class_name": "BE"})
+    await db.answer_sheets.insert_many([
+        {"id": f"sheet-{i}", "exam_id": "exam-1", "student_id": "student-1", "pdf_filename": str(ObjectId()),
+         "assigned_teacher_id": "teacher-1", "status": "pending"}
+        for i in range(4)
+    ])
+    await db.stats.insert_one({"_id": server.STATS_DOC_ID, "answer_sheets": 4, "pending_sheets": 4})
+    # As at startup
+    await server.warm_reference_caches(db)
+
+
+def pdf(filename: str) -> UploadFile:
+    return UploadFile(io.BytesIO(b"%PDF-1.4\n"), filename=filename)
+
+
+def scenarios():
+    """name -> zero-argument coroutine factory calling the handler"""
+    return {
+        "update_student": lambda: server.update_student("student-1", server.StudentCreate(
+            name="RT Student 2", email="rt-student@example.com", roll_number="RT-1", class_name="BE",
+            password="unused")),
+        "update_teacher": lambda: server.update_teacher("teacher-1", server.TeacherCreate(
+            name="RT Teacher 2", email="rt-teacher@example.com", subject_ids=["subject-1"], password="unused")),
+        "update_subject": lambda: server.update_subject("subject-1", server.SubjectCreate(
+            name="Round Trips 2", code="RT-SUBJ", class_name="BE")),
+        "update_exam": lambda: server.update_exam("exam-1", server.ExamCreate(
+            subject_id="subject-1", exam_type="CA-1", date="2026-01-02", total_marks=20, class_name="BE")),
+        "assign_answer_sheet": lambda: server.assign_answer_sheet("sheet-0", teacher_id="teacher-1"),
+        "bulk_assign_answer_sheets": lambda: server.bulk_assign_answer_sheets(server.BulkAssignment(assignments=[
+            server.SheetAssignment(sheet_id="sheet-0", teacher_id="teacher-1"),
+            server.SheetAssignment(sheet_id="sheet-1", teacher_id=None),
+            server.SheetAssignment(sheet_id="missing", teacher_id="teacher-1"),
+        ]), current_user=ADMIN),
+        "grade_answer_sheet": lambda: server.grade_answer_sheet("sheet-1", server.MarkSubmission(total_marks=12)),
+        "save_answer_sheet_draft": lambda: server.save_answer_sheet_draft("sheet-0", server.MarkSubmission(
+            question_marks=[server.QuestionMark(question_number=1, marks_obtained=4.5, max_marks=10)])),
+        "patch_answer_sheet_draft": lambda: server.patch_answer_sheet_draft("sheet-0", server.DraftPatch(
+            annotations=server.AnnotationOps(
+                add=[server.Annotation(type="correct", question_number=1, x=0.2, y=0.3, page=1)],
+                update=[server.AnnotationChange(id="missing", x=0.5)],
+            ),
+            question_marks=server.QuestionMarkOps(
+                set=[server.QuestionMark(question_number=1, marks_obtained=5, max_marks=10)],
+            ),
+        )),
+        "finalize_answer_sheet": lambda: server.finalize_answer_sheet("sheet-0"),
+        "upload_answer_sheet": lambda: server.upload_answer_sheet(
+            exam_id="exam-1", student_id="student-2", assigned_teacher_id=None, file=pdf("upload.pdf"),
+            current_user=TEACHER),
+        "reupload_answer_sheet": lambda: server.reupload_answer_sheet(
+            "sheet-2", pdf("reupload.pdf"), current_user=ADMIN),
+        "reupload_answer_sheet_teacher": lambda: server.reupload_answer_sheet(
+            "sheet-3", pdf("reupload.pdf"), current_user=TEACHER),
+    }
+
+
+async def count_round_trips():
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=2000, event_listeners=[counter])
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        client.close()
+        return None, f"No mongod reachable at {MONGO_URL}: {e}"
+
+    db = client[f"gradeflow_round_trip_test_{uuid.uuid4().hex[:8]}"]
+    tracer = DepthTracer()
+    saved = server.db, server.fs_bucket
+    server.db = TracedDatabase(db, tracer)
+    server.fs_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="answer_sheets")
+    results = {}
+    try:
+        await seed(db)
+        for name, call in scenarios().items():
+            counter.commands.clear()
+            tracer.reset()
+            await call()
+            results[name] = {"commands": list(counter.commands), "depth": tracer.depth}
+    finally:
+        server.db, server.fs_bucket = saved
+        for cache in server.REFERENCE_CACHES.values():
+            cache.invalidate()
+        server.teacher_access_cache.clear()
+        await client.drop_database(db.name)
+        client.close()
+    return results, None
+
+
+@pytest.fixture(scope="module")
+def round_trips():
+    results, error = asyncio.run(count_round_trips())
+    if error:
+        pytest.skip(error)
+    return results
+
+
+@pytest.mark.parametrize("name", list(ROUND_TRIP_BUDGETS))
+def test_round_trip_budget(round_trips, name):
+    commands = round_trips[name]["commands"]
+    max_commands, _ = ROUND_TRIP_BUDGETS[name]
+    assert len(commands) <= max_commands, f"{name} sent {len(commands)} commands: {commands}"
+
+
+@pytest.mark.parametrize("name", list(ROUND_TRIP_BUDGETS))
+def test_critical_path_depth(round_trips, name):
+    depth = round_trips[name]["depth"]
+    _, max_depth = ROUND_TRIP_BUDGETS[name]
+    assert depth <= max_depth, f"{name} waits on {depth} sequential Mongo calls (budget {max_depth})"
+
+
+if __name__ == "__main__":
+    results, error = asyncio.run(count_round_trips())
+    if error:
+        print(f"⚠️  {error}")
+        raise SystemExit(0)
+
+    print("=" * 70)
+    print("ROUND TRIPS PER HANDLER")
+    print("=" * 70)
+    failures = 0
+    print(f"   {'handler':30} {'commands':>9} {'depth':>6}")
+    for name, result in results.items():
+        commands, depth = result["commands"], result["depth"]
+        max_commands, max_depth = ROUND_TRIP_BUDGETS[name]
+        ok = len(commands) <= max_commands and depth <= max_depth
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name:30} {len(commands):>4}/{max_commands:<4} {depth:>3}/{max_depth:<3} "
+              f"{', '.join(commands)}")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,126 @@
+"""
+Per-student results transcripts.
+
+The student dashboard reads one document per student from `student_results`
+instead of joining the roster, exams, subjects and answer sheets itself:
+
+    {"student_id": ..., "student": {<the student document>},
+     "results": [{"sheet_id", "exam_id", "exam_type", "exam_date", "total_marks",
+                  "subject_id", "subject_name", "status", "marks_obtained",
+                  "remarks", "checked_at", "created_at"}, ...],   # oldest sheet first
+     "updated_at": ...}
+
+server.py keeps it current: uploading or grading a sheet puts its entry,
+deleting a sheet removes it, and edits to a student, exam or subject rewrite
+the copies held here. Those writes never create a transcript. A missing one
+(a student who has not looked yet, or data from before this collection) is
+built from the answer sheets on first read, stored only if no other request
+stored one first, and then caught up with sheet writes that landed while it
+was being built.
+"""
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+COLLECTION = "student_results"
+
+# Exam fields copied into each entry, keyed by entry field
+EXAM_FIELDS = {"exam_type": "exam_type", "exam_date": "date", "total_marks": "total_marks", "subject_id": "subject_id"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def result_entry(sheet: dict, exam: Optional[dict], subject: Optional[dict]) -> dict:
+    """Transcript entry for an answer sheet, with its exam and subject copied in"""
+    exam = exam or {}
+    entry = {"sheet_id": sheet["id"], "exam_id": sheet["exam_id"]}
+    entry.update((field, exam.get(source)) for field, source in EXAM_FIELDS.items())
+    entry.update({
+        "subject_name": subject.get("name") if subject else None,
+        "status": sheet.get("status", "pending"),
+        "marks_obtained": sheet.get("marks_obtained"),
+        "remarks": sheet.get("remarks"),
+        "checked_at": sheet.get("checked_at"),
+        "created_at": sheet.get("created_at"),
+    })
+    return entry
+
+
+def build(student: dict, sheets: Iterable[dict], exams: Iterable[dict], subjects: Iterable[dict]) -> dict:
+    """A complete transcript from the student's sheets and the exams and subjects they refer to"""
+    exams_by_id = {exam["id"]: exam for exam in exams}
+    subjects_by_id = {subject["id"]: subject for subject in subjects}
+    results = []
+    for sheet in sheets:
+        exam = exams_by_id.get(sheet["exam_id"])
+        results.append(result_entry(sheet, exam, subjects_by_id.get(exam["subject_id"]) if exam else None))
+    results.sort(key=lambda entry: entry.get("created_at") or "")
+    return {"student_id": student["id"], "student": student, "results": results, "updated_at": _now()}
+
+
+async def save(db, transcript: dict) -> bool:
+    """Store a freshly built transcript unless one exists already; True if this one was stored"""
+    result = await db[COLLECTION].update_one(
+        {"student_id": transcript["student_id"]}, {"$setOnInsert": transcript}, upsert=True
+    )
+    return result.upserted_id is not None
+
+
+async def put_entry(db, student_id: str, entry: dict):
+    """Add or replace the entry for entry["sheet_id"] in one atomic update, keeping results oldest first.
+
+    The other entries are already in order, so the new one goes between
+    those created no later and those created after it.
+    """
+    created_at = {"$literal": entry.get("created_at")}
+    others = {"$filter": {
+        "input": {"$ifNull": ["$results", []]},
+        "as": "other",
+        "cond": {"$ne": ["$$other.sheet_id", {"$literal": entry["sheet_id"]}]},
+    }}
+    results = {"$let": {"vars": {"others": others}, "in": {"$concatArrays": [
+        {"$filter": {"input": "$$others", "as": "other", "cond": {"$lte": ["$$other.created_at", created_at]}}},
+        [{"$literal": entry}],
+        {"$filter": {"input": "$$others", "as": "other", "cond": {"$gt": ["$$other.created_at", created_at]}}},
+    ]}}}
+    await db[COLLECTION].update_one(
+        {"student_id": student_id}, [{"$set": {"results": results, "updated_at": _now()}}]
+    )
+
+
+async def remove_entry(db, student_id: str, sheet_id: str):
+    await db[COLLECTION].update_one(
+        {"student_id": student_id},
+        {"$pull": {"results": {"sheet_id": sheet_id}}, "$set": {"updated_at": _now()}},
+    )
+
+
+async def set_student(db, student_id: str, fields: dict):
+    """Copy changed student fields; needs no read of the current student"""
+    await db[COLLECTION].update_one(
+        {"student_id": student_id}, {"$set": {f"student.{name}": value for name, value in fields.items()}}
+    )
+
+
+async def delete_transcript(db, student_id: str):
+    await db[COLLECTION].delete_one({"student_id": student_id})
+
+
+async def update_exam(db, exam: dict, subject: Optional[dict]):
+    """Rewrite the copied exam fields (and subject name) in every entry for `exam`"""
+    values = {field: exam.get(source) for field, source in EXAM_FIELDS.items()}
+    values["subject_name"] = subject.get("name") if subject else None
+    await db[COLLECTION].update_many(
+        {"results.exam_id": exam["id"]},
+        {"$set": {f"results.$[entry].{field}": value for field, value in values.items()}},
+        array_filters=[{"entry.exam_id": exam["id"]}],
+    )
+
+
+async def update_subject(db, subject: dict):
+    await db[COLLECTION].update_many(
+        {"results.subject_id": subject["id"]},
+        {"$set": {"results.$[entry].subject_name": subject.get("name")}},
+        array_filters=[{"entry.subject_id": subject["id"]}],
+    )
@@ -7,6 +7,7 @@ import TeacherDashboard from './components/TeacherDashboard';
 import StudentDashboard from './components/StudentDashboard';
 import { Toaster } from './components/ui/sonner';
 import { API } from './config';
+import { api } from './lib/apiClient';
 
 // Export API for backward compatibility if needed
 export { API };
@@ -29,9 +30,14 @@ function App() {
   };
 
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      api.post('/auth/logout', { refresh_token: refreshToken }).catch(() => {});
+    }
     setUser(null);
     localStorage.removeItem('user');
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
   };
 
   if (loading) {
@@ -22,12 +22,15 @@ const Login = ({ onLogin }) => {
         password,
       });
 
-      const { user, token } = response.data;
+      const { user, token, refresh_token } = response.data;
 
       toast.success('Login successful!');
       if (token) {
         localStorage.setItem('token', token);
       }
+      if (refresh_token) {
+        localStorage.setItem('refresh_token', refresh_token);
+      }
       onLogin(user);
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Login failed. Please check your credentials.');
@@ -1,14 +1,23 @@
-import { useState, useEffect, useMemo } from 'react';
+import { useState, useEffect, useMemo, useRef } from 'react';
 import { Document, Page, pdfjs } from 'react-pdf';
 import 'react-pdf/dist/esm/Page/AnnotationLayer.css';
 import 'react-pdf/dist/esm/Page/TextLayer.css';
 import { API } from '../config';
+import { api } from '../lib/apiClient';
 
 // Configure PDF.js worker
 // Use the worker from the installed package (copied to public folder)
 // This ensures version compatibility and avoids CDN issues
 pdfjs.GlobalWorkerOptions.workerSrc = '/pdf.worker.min.mjs';
 
+const SAVED_ANNOTATION_SYMBOLS = {
+  correct: { text: '✓', className: 'text-green-600' },
+  incorrect: { text: '✗', className: 'text-red-600' },
+  'half-mark': { text: '½', className: 'text-blue-600' },
+  'quarter-mark': { text: '¼', className: 'text-purple-600' },
+  na: { text: 'NA', className: 'text-gray-600' },
+};
+
 const PdfViewer = ({
   sheetId,
   onNumPagesChange,
@@ -18,9 +27,12 @@ const PdfViewer = ({
   onMouseMovePage,
   onMouseUpPage,
   quality = 'high', // 'high' or 'fast' - fast reduces resolution for quicker loading
+  annotationCounts, // sheet.annotation_counts; when given, saved annotations are shown read-only
 }) => {
   const [numPages, setNumPages] = useState(null);
   const [visiblePages, setVisiblePages] = useState(null);
+  const [savedAnnotations, setSavedAnnotations] = useState({});
+  const requestedPages = useRef(new Set());
   const token = localStorage.getItem('token');
 
   const fileUrl = `${API}/answer-sheets/${sheetId}/download`;
@@ -33,6 +45,24 @@ const PdfViewer = ({
 
   // Continuous mode: no explicit pageNumber tracking here
 
+  useEffect(() => {
+    requestedPages.current = new Set();
+    setSavedAnnotations({});
+  }, [sheetId]);
+
+  // Saved annotations are fetched one page at a time as pages render, and
+  // only for pages the sheet's counts say have any.
+  const loadSavedAnnotations = (pageNumber) => {
+    if (!annotationCounts?.[pageNumber] || requestedPages.current.has(pageNumber)) return;
+    requestedPages.current.add(pageNumber);
+    api.get(`/answer-sheets/${sheetId}/annotations`, { params: { page: pageNumber } })
+      .then(({ data }) => setSavedAnnotations((prev) => ({ ...prev, [pageNumber]: data })))
+      .catch((error) => {
+        requestedPages.current.delete(pageNumber);
+        console.error('Failed to load annotations:', error);
+      });
+  };
+
   const handleLoadSuccess = async (pdf) => {
     const nextNumPages = pdf?.numPages || 0;
     setNumPages(nextNumPages);
@@ -100,12 +130,30 @@ const PdfViewer = ({
                 scale={quality === 'fast' ? 0.75 : 1}
                 renderTextLayer={false}
                 renderAnnotationLayer={false}
+                onRenderSuccess={() => loadSavedAnnotations(p)}
                 loading={
                   <div className="flex items-center justify-center p-8 bg-gray-100" style={{ width: width, height: width * 1.414 }}>
                     <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-purple-600"></div>
                   </div>
                 }
               />
+              {(savedAnnotations[p] || []).length > 0 && (
+                <div className="absolute inset-0 pointer-events-none">
+                  {savedAnnotations[p].map((ann) => {
+                    const symbol = SAVED_ANNOTATION_SYMBOLS[ann.type];
+                    return (
+                      <span
+                        key={ann.id}
+                        className={`absolute font-bold text-xl ${symbol ? symbol.className : 'text-gray-800'}`}
+                        style={{ left: `${ann.x * 100}%`, top: `${ann.y * 100}%`, transform: 'translate(-50%, -50%)' }}
+                        title={`Q${ann.question_number} - ${ann.type}`}
+                      >
+                        {symbol ? symbol.text : ann.value}
+                      </span>
+                    );
+                  })}
+                </div>
+              )}
               {typeof renderAnnotations === 'function' && (
                 <div className="absolute inset-0">
                   {renderAnnotations(p)}
@@ -1,5 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { api } from '../lib/apiClient';
+import { saveDraft } from '../lib/draftSync';
 import { Button } from './ui/button';
 import { Card, CardContent } from './ui/card';
 import { Input } from './ui/input';
@@ -21,6 +22,8 @@ const SimplifiedEvaluationInterface = ({ sheetId, examId, onClose, onSave }) =>
   const [showQuestionPaper, setShowQuestionPaper] = useState(false);
   const [autoSaveEnabled, setAutoSaveEnabled] = useState(true);
   const [lastSaved, setLastSaved] = useState(null);
+  // Last draft the server acknowledged; autosave sends changes against it
+  const savedDraftRef = useRef(null);
 
   useEffect(() => {
     fetchSheetData();
@@ -40,11 +43,12 @@ const SimplifiedEvaluationInterface = ({ sheetId, examId, onClose, onSave }) =>
             max_marks: q.max_marks,
           })) || [];
 
-          await api.put(`/answer-sheets/${sheetId}/grade`, {
+          // Drafts keep the sheet pending and skip the Excel export
+          await saveDraft(sheetId, {
             question_marks: questionMarksList,
             annotations: annotations,
             remarks: `Total: ${score.total}/${score.maxTotal} (${score.percentage}%)`,
-          });
+          }, savedDraftRef);
 
           setLastSaved(new Date());
         } catch (error) {
@@ -58,10 +62,18 @@ const SimplifiedEvaluationInterface = ({ sheetId, examId, onClose, onSave }) =>
 
   const fetchSheetData = async () => {
     try {
-      const [sheetRes, examRes] = await Promise.all([
+      const [sheetRes, examRes, draftRes, annotationsRes] = await Promise.all([
         api.get(`/answer-sheets/${sheetId}?mask_identity=true`),
-        api.get(`/exams/${examId}`)
+        api.get(`/exams/${examId}`),
+        // 404 when nothing has been autosaved since the last grading
+        api.get(`/answer-sheets/${sheetId}/draft`).catch(() => null),
+        api.get(`/answer-sheets/${sheetId}/annotations`),
       ]);
+      // An unfinished draft is newer than whatever was last graded
+      const saved = draftRes
+        ? draftRes.data
+        : { question_marks: sheetRes.data.question_marks, annotations: annotationsRes.data };
+      savedDraftRef.current = draftRes ? draftRes.data : null;
       setSheet(sheetRes.data);
       setExam(examRes.data);
       
@@ -76,17 +88,20 @@ const SimplifiedEvaluationInterface = ({ sheetId, examId, onClose, onSave }) =>
       }
       
       // Initialize question marks from existing data
-      if (sheetRes.data.question_marks && sheetRes.data.question_marks.length > 0) {
+      if (saved.question_marks && saved.question_marks.length > 0) {
         const marks = {};
-        sheetRes.data.question_marks.forEach(qm => {
+        saved.question_marks.forEach(qm => {
           marks[qm.question_number] = qm.marks_obtained;
         });
         setQuestionMarks(marks);
       }
       
       // Initialize annotations if any
-      if (sheetRes.data.annotations) {
-        setAnnotations(sheetRes.data.annotations);
+      if (saved.annotations) {
+        setAnnotations(saved.annotations);
+      }
+      if (draftRes) {
+        setLastSaved(new Date(draftRes.data.saved_at));
       }
     } catch (error) {
       toast.error('Failed to load answer sheet');
@@ -171,7 +186,8 @@ const SimplifiedEvaluationInterface = ({ sheetId, examId, onClose, onSave }) =>
         max_marks: q.max_marks,
       })) || [];
 
-      await api.put(`/answer-sheets/${sheetId}/grade`, {
+      // Finalizing grades the sheet and discards the autosaved draft
+      await api.post(`/answer-sheets/${sheetId}/finalize`, {
         question_marks: questionMarksList,
         annotations: annotations,
         remarks: `Total: ${score.total}/${score.maxTotal} (${score.percentage}%)`,
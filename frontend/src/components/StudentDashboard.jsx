@@ -6,9 +6,7 @@ import { toast } from 'sonner';
 import { LogOut, FileText, GraduationCap, TrendingUp, Award } from 'lucide-react';
 
 const StudentDashboard = ({ user, onLogout }) => {
-  const [answerSheets, setAnswerSheets] = useState([]);
-  const [exams, setExams] = useState([]);
-  const [subjects, setSubjects] = useState([]);
+  const [results, setResults] = useState([]);
   const [loading, setLoading] = useState(true);
   const [studentData, setStudentData] = useState(null);
 
@@ -18,21 +16,10 @@ const StudentDashboard = ({ user, onLogout }) => {
 
   const fetchData = async () => {
     try {
-      const [studentsRes, examsRes, subjectsRes] = await Promise.all([
-        api.get('/students'),
-        api.get('/exams'),
-        api.get('/subjects'),
-      ]);
-
-      const currentStudent = studentsRes.data.find(s => s.email === user.email);
-      if (currentStudent) {
-        setStudentData(currentStudent);
-        const sheetsRes = await api.get(`/answer-sheets?student_id=${currentStudent.id}`);
-        setAnswerSheets(sheetsRes.data);
-      }
-
-      setExams(examsRes.data);
-      setSubjects(subjectsRes.data);
+      // One transcript document with exam and subject details already joined in
+      const { data } = await api.get('/me/results');
+      setStudentData(data.student);
+      setResults(data.results);
     } catch (error) {
       toast.error('Failed to fetch data');
     } finally {
@@ -40,29 +27,16 @@ const StudentDashboard = ({ user, onLogout }) => {
     }
   };
 
-  const getExamDetails = (examId) => {
-    const exam = exams.find(e => e.id === examId);
-    if (!exam) return { type: '', totalMarks: 0, subjectName: '' };
-
-    const subject = subjects.find(s => s.id === exam.subject_id);
-    return {
-      type: exam.exam_type,
-      totalMarks: exam.total_marks,
-      subjectName: subject ? subject.name : 'Unknown',
-    };
-  };
-
   const calculateStats = () => {
-    const checkedSheets = answerSheets.filter(s => s.status === 'checked');
+    const checkedSheets = results.filter(r => r.status === 'checked');
     if (checkedSheets.length === 0) return { average: 0, total: 0, percentage: 0 };
 
-    const totalMarks = checkedSheets.reduce((sum, sheet) => {
-      return sum + (sheet.marks_obtained || 0);
+    const totalMarks = checkedSheets.reduce((sum, result) => {
+      return sum + (result.marks_obtained || 0);
     }, 0);
 
-    const totalPossible = checkedSheets.reduce((sum, sheet) => {
-      const exam = exams.find(e => e.id === sheet.exam_id);
-      return sum + (exam ? exam.total_marks : 0);
+    const totalPossible = checkedSheets.reduce((sum, result) => {
+      return sum + (result.total_marks || 0);
     }, 0);
 
     return {
@@ -73,8 +47,8 @@ const StudentDashboard = ({ user, onLogout }) => {
   };
 
   const stats = calculateStats();
-  const checkedCount = answerSheets.filter(s => s.status === 'checked').length;
-  const pendingCount = answerSheets.filter(s => s.status === 'pending').length;
+  const checkedCount = results.filter(r => r.status === 'checked').length;
+  const pendingCount = results.filter(r => r.status === 'pending').length;
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-slate-50 via-green-50 to-teal-50" data-testid="student-dashboard">
@@ -130,7 +104,7 @@ const StudentDashboard = ({ user, onLogout }) => {
               <div className="flex items-center justify-between">
                 <div>
                   <p className="text-sm font-medium text-gray-600 mb-1">Total Exams</p>
-                  <p className="text-3xl font-bold text-gray-900">{answerSheets.length}</p>
+                  <p className="text-3xl font-bold text-gray-900">{results.length}</p>
                 </div>
                 <div className="p-3 bg-gradient-to-br from-blue-500 to-cyan-500 rounded-xl shadow-lg">
                   <FileText className="w-6 h-6 text-white" />
@@ -194,7 +168,7 @@ const StudentDashboard = ({ user, onLogout }) => {
                 <div className="animate-spin rounded-full h-12 w-12 border-b-2 border-green-600 mb-4"></div>
                 <p className="text-gray-600 font-medium">Loading your results...</p>
               </div>
-            ) : answerSheets.length === 0 ? (
+            ) : results.length === 0 ? (
               <div className="text-center py-12">
                 <FileText className="w-16 h-16 text-gray-300 mx-auto mb-4" />
                 <p className="text-gray-500">No exam results available yet</p>
@@ -212,32 +186,31 @@ const StudentDashboard = ({ user, onLogout }) => {
                     </tr>
                   </thead>
                   <tbody>
-                    {answerSheets.map((sheet) => {
-                      const examDetails = getExamDetails(sheet.exam_id);
+                    {results.map((result) => {
                       return (
-                        <tr key={sheet.id} className="border-b hover:bg-gray-50">
-                          <td className="py-3 px-4 font-medium">{examDetails.subjectName}</td>
+                        <tr key={result.sheet_id} className="border-b hover:bg-gray-50">
+                          <td className="py-3 px-4 font-medium">{result.subject_name || 'Unknown'}</td>
                           <td className="py-3 px-4">
-                            <span className="badge badge-info">{examDetails.type}</span>
+                            <span className="badge badge-info">{result.exam_type}</span>
                           </td>
                           <td className="py-3 px-4">
-                            {sheet.status === 'checked' ? (
+                            {result.status === 'checked' ? (
                               <span className="badge badge-success">Checked</span>
                             ) : (
                               <span className="badge badge-warning">Pending</span>
                             )}
                           </td>
                           <td className="py-3 px-4">
-                            {sheet.marks_obtained !== null ? (
+                            {result.marks_obtained !== null ? (
                               <span className="font-semibold text-lg">
-                                {sheet.marks_obtained}/{examDetails.totalMarks}
+                                {result.marks_obtained}/{result.total_marks}
                               </span>
                             ) : (
                               <span className="text-gray-400">Not graded</span>
                             )}
                           </td>
                           <td className="py-3 px-4 text-gray-600">
-                            {sheet.remarks || '-'}
+                            {result.remarks || '-'}
                           </td>
                         </tr>
                       );
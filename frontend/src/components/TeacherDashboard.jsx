@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { api } from '../lib/apiClient';
+import { api, getAllPages } from '../lib/apiClient';
 import { Button } from './ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from './ui/card';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from './ui/dialog';
@@ -16,6 +16,9 @@ import SimplifiedEvaluationInterface from './SimplifiedEvaluationInterface';
 const TeacherDashboard = ({ user, onLogout }) => {
   const EXAM_TYPES = ['CA-1', 'CA-2', 'Mid Semester'];
   const [answerSheets, setAnswerSheets] = useState([]);
+  const [queueExams, setQueueExams] = useState([]);
+  const [queueCounts, setQueueCounts] = useState({ pending: 0, checked: 0 });
+  // Only the upload dialog needs these; loaded when it opens
   const [students, setStudents] = useState([]);
   const [exams, setExams] = useState([]);
   const [subjects, setSubjects] = useState([]);
@@ -55,63 +58,64 @@ const TeacherDashboard = ({ user, onLogout }) => {
 
   const fetchData = async () => {
     try {
-      // First, get teacher data to find teacher ID
-      const teacherEmail = user.email;
-      const teacherData = await api.get('/teachers');
-      const currentTeacher = teacherData.data.find(t => t.email === teacherEmail);
+      // The work queue comes back joined with student, exam and subject labels,
+      // pending sheets first; counts and exams cover the whole queue on every page
+      const sheets = [];
+      let queue;
+      let after;
+      do {
+        const response = await api.get('/teachers/me/queue', { params: after ? { after } : {} });
+        queue = response.data;
+        sheets.push(...queue.sheets);
+        after = response.headers['x-next-cursor'];
+      } while (after);
 
-      if (!currentTeacher) {
-        toast.error('Teacher profile not found');
-        setLoading(false);
-        return;
-      }
-
-      // Fetch only data needed for this teacher - use teacher_id filter on server
-      const [sheetsRes, studentsRes, examsRes, subjectsRes] = await Promise.all([
-        api.get(`/answer-sheets?teacher_id=${currentTeacher.id}`),
-        api.get('/students'),
-        api.get('/exams'),
-        api.get('/subjects'),
-      ]);
-
-      setAnswerSheets(sheetsRes.data);
-      setStudents(studentsRes.data);
-      setExams(examsRes.data || []);
-      setSubjects(subjectsRes.data || []);
-      setTeacherSubjectIds(Array.isArray(currentTeacher.subject_ids) ? currentTeacher.subject_ids : []);
+      setAnswerSheets(sheets);
+      setQueueExams(queue.exams);
+      setQueueCounts({ pending: queue.pending, checked: queue.checked });
+      setTeacherSubjectIds(queue.subject_ids);
     } catch (error) {
       console.error('Error fetching data:', error);
-      toast.error('Failed to fetch data');
+      toast.error(error.status === 404 ? 'Teacher profile not found' : 'Failed to fetch data');
     } finally {
       setLoading(false);
     }
   };
 
-  const getStudentName = (studentId) => {
-    const student = students.find(s => s.id === studentId);
-    return student ? student.name : 'Unknown';
+  const fetchUploadOptions = async () => {
+    try {
+      const [studentsRes, examsRes, subjectsRes] = await Promise.all([
+        getAllPages('/students'),
+        getAllPages('/exams'),
+        getAllPages('/subjects'),
+      ]);
+      setStudents(studentsRes.data);
+      setExams(examsRes.data || []);
+      setSubjects(subjectsRes.data || []);
+    } catch (error) {
+      toast.error('Failed to load students and subjects');
+    }
   };
 
-  const getStudentRollNumber = (studentId) => {
-    const student = students.find(s => s.id === studentId);
-    return student ? student.roll_number : 'N/A';
+  const handleUploadDialogChange = (open) => {
+    setUploadDialogOpen(open);
+    if (open) fetchUploadOptions();
   };
 
   const getExamDetails = (examId) => {
-    const exam = exams.find(e => e.id === examId);
+    const exam = queueExams.find(e => e.exam_id === examId);
     if (!exam) return { type: '', totalMarks: 0, subjectName: '', subjectId: '' };
-    
-    const subject = subjects.find(s => s.id === exam.subject_id);
+
     return {
       type: exam.exam_type,
       totalMarks: exam.total_marks,
-      subjectName: subject ? subject.name : 'Unknown',
+      subjectName: exam.subject_name || 'Unknown',
       subjectId: exam.subject_id,
     };
   };
 
   const getExamQuestions = (examId) => {
-    const exam = exams.find(e => e.id === examId);
+    const exam = queueExams.find(e => e.exam_id === examId);
     return exam && Array.isArray(exam.questions) ? exam.questions : [];
   };
 
@@ -421,11 +425,10 @@ const TeacherDashboard = ({ user, onLogout }) => {
 
   // Filter and search logic
   const filteredSheets = answerSheets.filter(sheet => {
-    const studentName = getStudentName(sheet.student_id).toLowerCase();
-    const rollNumber = getStudentRollNumber(sheet.student_id).toLowerCase();
-    const examDetails = getExamDetails(sheet.exam_id);
-    const examType = examDetails.type.toLowerCase();
-    const subjectName = examDetails.subjectName.toLowerCase();
+    const studentName = (sheet.student_name || '').toLowerCase();
+    const rollNumber = (sheet.roll_number || '').toLowerCase();
+    const examType = (sheet.exam_type || '').toLowerCase();
+    const subjectName = (sheet.subject_name || '').toLowerCase();
     
     const matchesSearch = searchTerm === '' || 
       studentName.includes(searchTerm.toLowerCase()) ||
@@ -445,9 +448,8 @@ const TeacherDashboard = ({ user, onLogout }) => {
   const groupedBySubjectAndType = (() => {
     const map = {};
     filteredSheets.forEach(sheet => {
-      const d = getExamDetails(sheet.exam_id);
-      const sid = d.subjectId || 'unknown';
-      const t = d.type || 'Unknown';
+      const sid = sheet.subject_id || 'unknown';
+      const t = sheet.exam_type || 'Unknown';
       if (!map[sid]) map[sid] = {};
       if (!map[sid][t]) map[sid][t] = { pending: [], checked: [] };
       if (sheet.status === 'checked') {
@@ -459,9 +461,9 @@ const TeacherDashboard = ({ user, onLogout }) => {
     return map;
   })();
 
-  const pendingCount = answerSheets.filter(s => s.status === 'pending').length;
-  const checkedCount = answerSheets.filter(s => s.status === 'checked').length;
-  const totalCount = answerSheets.length;
+  const pendingCount = queueCounts.pending;
+  const checkedCount = queueCounts.checked;
+  const totalCount = pendingCount + checkedCount;
 
   const handleCheckAnswerSheet = (sheet) => {
     setEvaluationSheetId(sheet.id);
@@ -473,14 +475,14 @@ const TeacherDashboard = ({ user, onLogout }) => {
     fetchData(); // Refresh data after saving
   };
 
-  const getMaskedStudentId = (studentId) => {
+  const getMaskedStudentId = (sheet) => {
     // Generate a consistent anonymous ID based on student ID
     // This ensures the same student always gets the same anonymous ID
     if (!maskIdentity) {
-      return getStudentName(studentId);
+      return sheet.student_name || 'Unknown';
     }
     // Simple hash-like function to create consistent anonymous IDs
-    const hash = studentId.split('').reduce((acc, char) => {
+    const hash = sheet.student_id.split('').reduce((acc, char) => {
       return ((acc << 5) - acc) + char.charCodeAt(0);
     }, 0);
     return `Student ${Math.abs(hash % 10000).toString().padStart(4, '0')}`;
@@ -488,8 +490,8 @@ const TeacherDashboard = ({ user, onLogout }) => {
 
   const renderAnswerSheetRow = (sheet) => {
     const examDetails = getExamDetails(sheet.exam_id);
-    const studentName = maskIdentity ? getMaskedStudentId(sheet.student_id) : getStudentName(sheet.student_id);
-    const rollNumber = maskIdentity ? '***' : getStudentRollNumber(sheet.student_id);
+    const studentName = maskIdentity ? getMaskedStudentId(sheet) : (sheet.student_name || 'Unknown');
+    const rollNumber = maskIdentity ? '***' : (sheet.roll_number || 'N/A');
 
     return (
       <tr key={sheet.id} className="border-b hover:bg-gray-50 transition-colors">
@@ -619,13 +621,13 @@ const TeacherDashboard = ({ user, onLogout }) => {
           </div>
         </div>
         {subjectIds.map((sid) => {
-          const subject = subjects.find(s => s.id === sid);
+          const subject = queueExams.find(e => e.subject_id === sid);
           const group = groupedBySubjectAndType[sid][type];
           return (
             <Card key={`${sid}-${type}`} className="border-0 shadow-md bg-white">
               <CardHeader className="pb-3">
                 <div className="flex items-center justify-between">
-                  <CardTitle>{subject ? subject.name : 'Unknown Subject'}</CardTitle>
+                  <CardTitle>{subject ? subject.subject_name : 'Unknown Subject'}</CardTitle>
                   <CardDescription>Pending {group.pending.length} • Checked {group.checked.length}</CardDescription>
                 </div>
               </CardHeader>
@@ -678,7 +680,7 @@ const TeacherDashboard = ({ user, onLogout }) => {
               </div>
             </div>
             <div className="flex items-center space-x-3">
-              <Dialog open={uploadDialogOpen} onOpenChange={setUploadDialogOpen}>
+              <Dialog open={uploadDialogOpen} onOpenChange={handleUploadDialogChange}>
                 <DialogTrigger asChild>
                   <Button variant="default" className="flex items-center space-x-2">
                     <Upload className="w-4 h-4" />
@@ -959,14 +961,11 @@ const TeacherDashboard = ({ user, onLogout }) => {
                     </SelectTrigger>
                     <SelectContent>
                       <SelectItem value="all">All Exams</SelectItem>
-                      {exams.map(exam => {
-                        const subject = subjects.find(s => s.id === exam.subject_id);
-                        return (
-                          <SelectItem key={exam.id} value={exam.id}>
-                            {subject ? subject.name : 'Unknown'} - {exam.exam_type}
-                          </SelectItem>
-                        );
-                      })}
+                      {queueExams.map(exam => (
+                        <SelectItem key={exam.exam_id} value={exam.exam_id}>
+                          {exam.subject_name || 'Unknown'} - {exam.exam_type}
+                        </SelectItem>
+                      ))}
                     </SelectContent>
                   </Select>
                   <Button variant="outline" onClick={handleExportMarksheet} disabled={filterExam === 'all'} title="Export marks to Excel">
@@ -1027,7 +1026,7 @@ const TeacherDashboard = ({ user, onLogout }) => {
             <DialogDescription>
               {selectedSheet && (
                 <>
-                  Student: <strong>{getStudentName(selectedSheet.student_id)}</strong> ({getStudentRollNumber(selectedSheet.student_id)}) | 
+                  Student: <strong>{selectedSheet.student_name || 'Unknown'}</strong> ({selectedSheet.roll_number || 'N/A'}) | 
                   Subject: <strong>{getExamDetails(selectedSheet.exam_id).subjectName}</strong> | 
                   Exam Type: <strong>{getExamDetails(selectedSheet.exam_id).type}</strong>
                 </>
@@ -1051,7 +1050,12 @@ const TeacherDashboard = ({ user, onLogout }) => {
                   </Button>
                 </div>
                 <div className="border rounded-lg overflow-hidden bg-gray-50" style={{ minHeight: '500px' }}>
-                  <PdfViewer sheetId={selectedSheet.id} quality="fast" width={600} />
+                  <PdfViewer
+                    sheetId={selectedSheet.id}
+                    quality="fast"
+                    width={600}
+                    annotationCounts={selectedSheet.annotation_counts}
+                  />
                 </div>
               </div>
 
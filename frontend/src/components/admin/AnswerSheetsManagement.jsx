@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { api } from '../../lib/apiClient';
+import { api, getAllPages } from '../../lib/apiClient';
 import { Button } from '../ui/button';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '../ui/dialog';
 import { Input } from '../ui/input';
@@ -35,11 +35,11 @@ const AnswerSheetsManagement = ({ onUpdate }) => {
   const fetchData = async () => {
     try {
       const [sheetsRes, studentsRes, teachersRes, examsRes, subjectsRes] = await Promise.all([
-        api.get('/answer-sheets'),
-        api.get('/students'),
-        api.get('/teachers'),
-        api.get('/exams'),
-        api.get('/subjects'),
+        getAllPages('/answer-sheets'),
+        getAllPages('/students'),
+        getAllPages('/teachers'),
+        getAllPages('/exams'),
+        getAllPages('/subjects'),
       ]);
       setAnswerSheets(sheetsRes.data);
       setStudents(studentsRes.data);
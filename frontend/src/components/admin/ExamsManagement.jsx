@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { api } from '../../lib/apiClient';
+import { api, getAllPages } from '../../lib/apiClient';
 import { Button } from '../ui/button';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '../ui/dialog';
 import { Input } from '../ui/input';
@@ -44,8 +44,8 @@ const ExamsManagement = () => {
   const fetchData = async () => {
     try {
       const [examsRes, subjectsRes] = await Promise.all([
-        api.get('/exams'),
-        api.get('/subjects'),
+        getAllPages('/exams'),
+        getAllPages('/subjects'),
       ]);
       setExams(examsRes.data);
       setSubjects(subjectsRes.data);
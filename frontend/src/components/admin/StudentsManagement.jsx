@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { api } from '../../lib/apiClient';
+import { api, getAllPages } from '../../lib/apiClient';
 import { Button } from '../ui/button';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '../ui/dialog';
 import { Input } from '../ui/input';
@@ -34,7 +34,7 @@ const StudentsManagement = () => {
   const fetchStudents = async (class_name = null) => {
     try {
       const params = class_name && class_name !== 'all' ? { class_name } : {};
-      const response = await api.get('/students', { params });
+      const response = await getAllPages('/students', { params });
       setStudents(response.data);
     } catch (error) {
       toast.error('Failed to fetch students');
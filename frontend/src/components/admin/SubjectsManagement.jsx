@@ -1,5 +1,5 @@
 import { useState, useEffect, useMemo } from 'react';
-import { api } from '../../lib/apiClient';
+import { api, getAllPages } from '../../lib/apiClient';
 import { Button } from '../ui/button';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '../ui/dialog';
 import { Input } from '../ui/input';
@@ -40,7 +40,7 @@ const SubjectsManagement = () => {
 
   const fetchSubjects = async () => {
     try {
-      const response = await api.get('/subjects');
+      const response = await getAllPages('/subjects');
       setSubjects(response.data);
     } catch (error) {
       toast.error('Failed to fetch subjects');
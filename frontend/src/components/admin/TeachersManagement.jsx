@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { api } from '../../lib/apiClient';
+import { api, getAllPages } from '../../lib/apiClient';
 import { Button } from '../ui/button';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '../ui/dialog';
 import { Input } from '../ui/input';
@@ -29,8 +29,8 @@ const TeachersManagement = () => {
   const fetchData = async () => {
     try {
       const [teachersRes, subjectsRes] = await Promise.all([
-        api.get('/teachers'),
-        api.get('/subjects'),
+        getAllPages('/teachers'),
+        getAllPages('/subjects'),
       ]);
       setTeachers(teachersRes.data);
       setSubjects(subjectsRes.data);
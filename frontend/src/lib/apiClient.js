@@ -20,12 +20,57 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Exchange the stored refresh token for a new access token. Concurrent 401s
+// share one in-flight refresh so the token is only rotated once per tab; the
+// server tolerates another tab presenting the same token moments later.
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshPromise = (refreshToken
+      ? axios.post(`${API}/auth/refresh`, { refresh_token: refreshToken }).then(({ data }) => {
+          localStorage.setItem('token', data.token);
+          localStorage.setItem('refresh_token', data.refresh_token);
+          return data.token;
+        })
+      : Promise.reject(new Error('No refresh token'))
+    ).finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
 // Response interceptor for better error handling
 api.interceptors.response.use(
   (response) => {
     return response;
   },
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    if (
+      error.response?.status === 401 &&
+      original &&
+      !original._retried &&
+      !original.url?.startsWith('/auth/')
+    ) {
+      original._retried = true;
+      // Another tab may already have refreshed; its tokens are shared through localStorage
+      const stored = localStorage.getItem('token');
+      if (stored && original.headers.Authorization !== `Bearer ${stored}`) {
+        original.headers.Authorization = `Bearer ${stored}`;
+        return api(original);
+      }
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch (refreshError) {
+        localStorage.removeItem('refresh_token');
+      }
+    }
+
     console.error('API Error:', error);
     
     // Handle network errors
@@ -62,4 +107,20 @@ api.interceptors.response.use(
       originalError: error
     });
   }
-);
\ No newline at end of file
+);
+// List endpoints return one page at a time and put the cursor for the next
+// page in the X-Next-Cursor header. Follow it until the list is complete and
+// resolve with an axios-like { data } so callers can swap this in for api.get.
+export const getAllPages = async (url, config = {}) => {
+  const items = [];
+  let after;
+  do {
+    const response = await api.get(url, {
+      ...config,
+      params: { ...(config.params || {}), ...(after ? { after } : {}) },
+    });
+    items.push(...response.data);
+    after = response.headers['x-next-cursor'];
+  } while (after);
+  return { data: items };
+};
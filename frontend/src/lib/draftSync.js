@@ -0,0 +1,63 @@
+import { api } from './apiClient';
+
+const ANNOTATION_FIELDS = ['type', 'question_number', 'x', 'y', 'page', 'value', 'marks'];
+
+// Changes between the last saved draft and the current one, in the shape
+// PATCH /answer-sheets/{id}/draft expects. Annotations are matched by id and
+// question marks by question_number.
+export const diffDraft = (saved, draft) => {
+  const savedAnnotations = new Map(saved.annotations.map((a) => [a.id, a]));
+  const currentIds = new Set(draft.annotations.map((a) => a.id));
+  const add = [];
+  const update = [];
+  draft.annotations.forEach((annotation) => {
+    const previous = savedAnnotations.get(annotation.id);
+    if (!previous) {
+      add.push(annotation);
+      return;
+    }
+    const changed = ANNOTATION_FIELDS.filter((field) => previous[field] !== annotation[field]);
+    if (changed.length > 0) {
+      const change = { id: annotation.id };
+      changed.forEach((field) => {
+        change[field] = annotation[field] ?? null;
+      });
+      update.push(change);
+    }
+  });
+  const remove = [...savedAnnotations.keys()].filter((id) => !currentIds.has(id));
+
+  const savedMarks = new Map(saved.question_marks.map((qm) => [qm.question_number, qm]));
+  const currentQuestions = new Set(draft.question_marks.map((qm) => qm.question_number));
+  const set = draft.question_marks.filter((qm) => {
+    const previous = savedMarks.get(qm.question_number);
+    return !previous || previous.marks_obtained !== qm.marks_obtained || previous.max_marks !== qm.max_marks;
+  });
+  const removeMarks = [...savedMarks.keys()].filter((number) => !currentQuestions.has(number));
+
+  const patch = {
+    annotations: { add, update, remove },
+    question_marks: { set, remove: removeMarks },
+  };
+  if (draft.remarks !== saved.remarks) {
+    patch.remarks = draft.remarks;
+  }
+  return patch;
+};
+
+// Autosave a draft, sending only what changed since the previous save.
+// `savedRef` is a React ref holding the last draft the server acknowledged;
+// the first save (or one after the server lost the draft) sends it whole.
+export const saveDraft = async (sheetId, draft, savedRef) => {
+  if (savedRef.current) {
+    try {
+      await api.patch(`/answer-sheets/${sheetId}/draft`, diffDraft(savedRef.current, draft));
+      savedRef.current = draft;
+      return;
+    } catch (error) {
+      if (error.status !== 404) throw error;
+    }
+  }
+  await api.put(`/answer-sheets/${sheetId}/draft`, draft);
+  savedRef.current = draft;
+};